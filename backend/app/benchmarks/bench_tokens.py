@@ -0,0 +1,60 @@
+"""Cost of validating a bearer token: full python-jose decode vs the cached
+TokenValidator path (digest lookup plus revocation check).
+
+Run from backend/app:
+
+    python -m benchmarks.bench_tokens --iterations 20000
+"""
+import argparse
+import sys
+import time
+from jose import jwt
+from core.config import settings
+from core.security import create_access_token
+from core.tokens import TokenValidator
+
+
+def timed(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Token validation micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct tokens in rotation")
+    args = parser.parse_args(argv)
+
+    tokens = [
+        create_access_token({"sub": f"user{i}@bench.readiq.io", "role": "student", "id": i,
+                             "tenant": settings.DEFAULT_TENANT, "gen": 0})
+        for i in range(args.tokens)
+    ]
+    validator = TokenValidator(settings.JWT_SECRET)
+    for token in tokens:
+        validator.validate(token)
+
+    def rotate(check):
+        i = 0
+
+        def step():
+            nonlocal i
+            check(tokens[i % len(tokens)])
+            i += 1
+        return step
+
+    decode_us = timed(rotate(lambda t: jwt.decode(t, settings.JWT_SECRET, algorithms=["HS256"])), args.iterations)
+    cached_us = timed(rotate(validator.validate), args.iterations)
+
+    print(f"{'path':<22}{'us/token':>12}")
+    print("-" * 34)
+    print(f"{'jose decode':<22}{decode_us:>12.2f}")
+    print(f"{'TokenValidator (hit)':<22}{cached_us:>12.2f}")
+    print(f"speedup: {decode_us / cached_us:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import random
+from dataclasses import dataclass, field
+from sqlalchemy import insert
+from core.database import Base
+from core.security import hash_password
+from models.user import User
+from models.course import Course
+from models.enrollment import Enrollment
+from models.progress import Progress
+from models.sync_receipt import SyncReceipt  # noqa: F401  (tables created with the rest)
+from models.progress_archive import ProgressArchive  # noqa: F401
+
+PASSWORD = "bench-password"
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+LANGUAGES = ["English", "Spanish", "French"]
+TAGS = ["animals", "adventure", "science", "history", "fantasy", "sports", "poetry", "mystery"]
+
+
+def _age_range(rng: random.Random) -> str:
+    low = rng.randint(5, 12)
+    return f"{low}-{low + 3}"
+
+
+@dataclass
+class Dataset:
+    run_id: str
+    parent_emails: list[str] = field(default_factory=list)
+    student_emails: list[str] = field(default_factory=list)
+    admin_email: str = ""
+    # student id -> parent email, course ids the student is (not) enrolled in
+    student_parent: dict[int, str] = field(default_factory=dict)
+    enrolled: dict[int, list[int]] = field(default_factory=dict)
+    unenrolled: dict[int, list[int]] = field(default_factory=dict)
+    student_email_of: dict[int, str] = field(default_factory=dict)
+    course_ids: list[int] = field(default_factory=list)
+    # email -> (user id, role), used to mint tokens without paying bcrypt per account
+    accounts: dict[str, tuple[int, str]] = field(default_factory=dict)
+
+
+async def seed(engine, session_factory, run_id: str, scale: int = 1, seed: int = 1234) -> Dataset:
+    """Create a deterministic dataset: per unit of scale, 25 guardians with 4
+    students each, 100 courses, 5 enrollments per student and 10 progress rows
+    per enrollment."""
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    data = Dataset(run_id=run_id)
+    # a single bcrypt hash shared by every account keeps seeding fast
+    hashed = hash_password(PASSWORD)
+    n_parents, n_courses = 25 * scale, 100 * scale
+
+    async with session_factory() as db:
+        admin = User(
+            username=f"{run_id}-admin", email=f"{run_id}-admin@bench.readiq.io",
+            hashed_password=hashed, role="admin", is_active=True, verified=True,
+        )
+        db.add(admin)
+        data.admin_email = admin.email
+
+        courses = [
+            Course(
+                title=f"{run_id} book {i}",
+                description="x" * rng.randint(50, 400),
+                reading_level=rng.choice(LEVELS),
+                age_range=_age_range(rng),
+                difficulty=rng.randint(1, 5),
+                language=rng.choice(LANGUAGES),
+                estimated_duration=rng.randint(10, 120),
+                tags=",".join(rng.sample(TAGS, 2)),
+            )
+            for i in range(n_courses)
+        ]
+        db.add_all(courses)
+
+        parents = [
+            User(
+                username=f"{run_id}-parent{i}", email=f"{run_id}-parent{i}@bench.readiq.io",
+                hashed_password=hashed, role=rng.choice(["parent", "teacher"]),
+                is_active=True, verified=True,
+            )
+            for i in range(n_parents)
+        ]
+        db.add_all(parents)
+        await db.flush()
+
+        students = []
+        for p_index, parent in enumerate(parents):
+            for s_index in range(4):
+                students.append(User(
+                    username=f"{run_id}-s{p_index}-{s_index}",
+                    email=f"{run_id}-s{p_index}-{s_index}@bench.readiq.io",
+                    hashed_password=hashed, role="student",
+                    is_active=True, verified=True, parent_id=parent.id,
+                ))
+        db.add_all(students)
+        await db.flush()
+
+        data.course_ids = [c.id for c in courses]
+        for user in [admin] + parents + students:
+            data.accounts[user.email] = (user.id, user.role)
+        data.parent_emails = [p.email for p in parents]
+        parent_email = {p.id: p.email for p in parents}
+        enrollment_rows, progress_rows = [], []
+        for student in students:
+            picked = rng.sample(data.course_ids, 5)
+            data.enrolled[student.id] = picked
+            data.unenrolled[student.id] = [c for c in rng.sample(data.course_ids, 25) if c not in picked]
+            data.student_parent[student.id] = parent_email[student.parent_id]
+            data.student_email_of[student.id] = student.email
+            data.student_emails.append(student.email)
+            for course_id in picked:
+                enrollment_rows.append({
+                    "student_id": student.id, "course_id": course_id, "assigned_by": student.parent_id,
+                })
+                pct = 0.0
+                for _ in range(10):
+                    pct = min(100.0, pct + rng.uniform(0, 15))
+                    progress_rows.append({
+                        "user_id": student.id, "course_id": course_id, "progress_percent": pct,
+                    })
+
+        await db.execute(insert(Enrollment), enrollment_rows)
+        await db.execute(insert(Progress), progress_rows)
+        await db.commit()
+
+    return data
@@ -0,0 +1,123 @@
+import itertools
+from core.config import settings
+from core.security import create_access_token
+from benchmarks.dataset import Dataset, PASSWORD
+
+
+class Context:
+    """Tokens and rotating inputs shared by the scenarios of one run."""
+
+    def __init__(self, data: Dataset):
+        self.data = data
+        self.tokens: dict[str, str] = {}
+        self.filename = None
+        self._students = itertools.cycle(sorted(data.enrolled))
+        self._parents = itertools.cycle(data.parent_emails)
+        self._pending_enrollments = iter([
+            (student_id, course_id)
+            for student_id, courses in sorted(data.unenrolled.items())
+            for course_id in courses
+        ])
+
+    def auth(self, email: str) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[email]}"}
+
+    def next_student(self) -> int:
+        return next(self._students)
+
+    def next_parent(self) -> str:
+        return next(self._parents)
+
+    def next_enrollment(self):
+        return next(self._pending_enrollments)
+
+
+async def prepare(client, ctx: Context):
+    # same claims as /api/auth/login issues; logging everyone in would spend
+    # most of the setup in bcrypt
+    for email, (user_id, role) in ctx.data.accounts.items():
+        ctx.tokens[email] = create_access_token(
+            {"sub": email, "role": role, "id": user_id, "tenant": settings.DEFAULT_TENANT}
+        )
+
+    # ~200 KB book text for the reading scenario
+    student_email = ctx.data.student_emails[0]
+    body = ("Once upon a time there was a benchmark. " * 5000).encode()
+    r = await client.post(
+        "/api/protected/reading/upload",
+        files={"file": (f"{ctx.data.run_id}.txt", body, "text/plain")},
+        headers=ctx.auth(student_email),
+    )
+    r.raise_for_status()
+    ctx.filename = r.json()["filename"]
+
+
+async def login(client, ctx: Context):
+    return await client.post(
+        "/api/auth/login", json={"email": ctx.next_parent(), "password": PASSWORD}
+    )
+
+
+async def me(client, ctx: Context):
+    return await client.get("/api/protected/me", headers=ctx.auth(ctx.next_parent()))
+
+
+async def list_courses(client, ctx: Context):
+    return await client.get("/api/protected/courses/", headers=ctx.auth(ctx.next_parent()))
+
+
+async def list_progress(client, ctx: Context):
+    student_id = ctx.next_student()
+    return await client.get(
+        "/api/protected/progress/", headers=ctx.auth(ctx.data.student_email_of[student_id])
+    )
+
+
+async def student_progress(client, ctx: Context):
+    student_id = ctx.next_student()
+    return await client.get(
+        f"/api/protected/students/{student_id}/progress",
+        headers=ctx.auth(ctx.data.student_parent[student_id]),
+    )
+
+
+async def dashboard(client, ctx: Context):
+    return await client.get("/api/protected/students/dashboard", headers=ctx.auth(ctx.next_parent()))
+
+
+async def enroll(client, ctx: Context):
+    student_id, course_id = ctx.next_enrollment()
+    return await client.post(
+        "/api/protected/enrollments/",
+        json={"student_id": student_id, "course_id": course_id},
+        headers=ctx.auth(ctx.data.student_parent[student_id]),
+    )
+
+
+async def ingest_progress(client, ctx: Context):
+    student_id = ctx.next_student()
+    return await client.post(
+        "/api/protected/progress/",
+        json={"course_id": ctx.data.enrolled[student_id][0], "progress_percent": 50.0},
+        headers=ctx.auth(ctx.data.student_email_of[student_id]),
+    )
+
+
+async def read_file(client, ctx: Context):
+    return await client.get(
+        f"/api/protected/reading/read/{ctx.filename}",
+        headers=ctx.auth(ctx.data.student_emails[0]),
+    )
+
+
+SCENARIOS = {
+    "login": login,
+    "me": me,
+    "list_courses": list_courses,
+    "list_progress": list_progress,
+    "student_progress": student_progress,
+    "dashboard": dashboard,
+    "enroll": enroll,
+    "ingest_progress": ingest_progress,
+    "read_file": read_file,
+}
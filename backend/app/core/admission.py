@@ -0,0 +1,152 @@
+import asyncio
+import math
+import time
+from collections import deque
+from starlette.responses import JSONResponse
+from core.cache import TTLCache
+from core.config import settings
+from core.metrics import Counter, Gauge, Histogram
+
+IN_FLIGHT = Gauge(
+    "readiq_admission_in_flight", "Requests running under a route concurrency limit.", ("route",)
+)
+QUEUED = Gauge(
+    "readiq_admission_queued", "Requests waiting for a slot under a route concurrency limit.", ("route",)
+)
+QUEUE_WAIT = Histogram(
+    "readiq_admission_queue_wait_seconds", "Time admitted requests spent queued.", ("route",)
+)
+SHED = Counter(
+    "readiq_admission_shed_total", "Requests rejected by admission control.", ("route", "reason")
+)
+
+
+class Rejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: float):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests at once; up to `queue_size` more wait, in
+    arrival order, for at most `timeout` seconds."""
+
+    def __init__(self, route: str, limit: int, queue_size: int, timeout: float):
+        self.route = route
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            IN_FLIGHT.inc(self.route)
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Rejected(503, "queue_full", self.timeout)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        QUEUED.inc(self.route)
+        started = time.perf_counter()
+        try:
+            # release() hands its slot straight to the waiter, so `active` is unchanged
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            # the slot may have been handed over just as the deadline fired
+            if not waiter.done() or waiter.cancelled():
+                raise Rejected(503, "deadline", self.timeout)
+        except asyncio.CancelledError:
+            # client went away; pass on a slot we were already given
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            QUEUED.dec(self.route)
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        QUEUE_WAIT.observe(self.route, value=time.perf_counter() - started)
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        IN_FLIGHT.dec(self.route)
+
+
+class TokenBuckets:
+    """Per-client token buckets: `per_minute` requests, refilled continuously,
+    with bursts of up to the same amount. A client idle long enough to refill
+    drops out of the cache, which reads as a full bucket."""
+
+    def __init__(self, per_minute: float, maxsize: int = 100_000):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._buckets = TTLCache(self.capacity / self.rate, maxsize=maxsize)
+
+    def take(self, client: str):
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            raise Rejected(429, "rate_limited", (1 - tokens) / self.rate)
+        self._buckets.set(client, (tokens - 1, now))
+
+
+class AdmissionMiddleware:
+    """Sheds load on expensive routes (bcrypt, SMTP) before it queues up behind
+    everything else: per-client rate limits first, then a per-route concurrency
+    limit with a bounded, deadline-aware queue. Rejections are 429 (this
+    client is too fast) or 503 (the server is busy), both with Retry-After."""
+
+    def __init__(self, app):
+        self.app = app
+        self.limiters = {
+            path: ConcurrencyLimiter(
+                path, limit, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+            )
+            for path, limit in settings.ADMISSION_CONCURRENCY.items()
+        }
+        self.buckets = {path: TokenBuckets(rate) for path, rate in settings.ADMISSION_RATE_PER_MINUTE.items()}
+
+    async def __call__(self, scope, receive, send):
+        if not settings.ADMISSION_CONTROL or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"].rstrip("/") or "/"
+        buckets = self.buckets.get(path)
+        limiter = self.limiters.get(path)
+        if buckets is None and limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if buckets is not None:
+                client = scope.get("client")
+                buckets.take(client[0] if client else "anonymous")
+            if limiter is not None:
+                await limiter.acquire()
+        except Rejected as e:
+            SHED.inc(path, e.reason)
+            detail = "Too many requests" if e.status_code == 429 else "Server busy, try again shortly"
+            response = JSONResponse(
+                {"detail": detail}, status_code=e.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,166 @@
+import hashlib
+import zlib
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from core.cache import TTLCache
+from core.config import settings
+
+# preference order when the client accepts several
+ENCODINGS = ("gzip", "deflate")
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript")
+# bodies above this are compressed off the event loop
+THREADPOOL_BYTES = 256 * 1024
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    best = None
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+def _compressor(encoding: str):
+    # gzip container for "gzip", zlib container for HTTP "deflate"
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    return zlib.compressobj(settings.COMPRESSION_LEVEL, zlib.DEFLATED, wbits)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    compressor = _compressor(encoding)
+    return compressor.compress(body) + compressor.flush()
+
+
+async def compress_async(body: bytes, encoding: str) -> bytes:
+    if len(body) >= THREADPOOL_BYTES:
+        return await run_in_threadpool(compress, body, encoding)
+    return compress(body, encoding)
+
+
+class CompressionMiddleware:
+    """gzip/deflate for compressible responses of at least
+    COMPRESSION_MIN_BYTES. Streaming bodies are compressed chunk by chunk and
+    flushed after each one; responses that already carry a Content-Encoding
+    (see CompressedBodies) pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or message["status"] < 200 or message["status"] in (204, 304)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body:
+                    # whole body in one message
+                    passthrough = True
+                    if len(body) < settings.COMPRESSION_MIN_BYTES:
+                        await send(start)
+                        await send(message)
+                        return
+                    body = await compress_async(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = _compressor(encoding)
+                del headers["Content-Length"]
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                await send(start)
+
+            data = compressor.compress(body)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # a comma-separated list; weak comparison, so W/"x" matches "x"
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CompressedBodies:
+    """Serialized response bodies kept with their compressed variants, so
+    identical bytes are encoded and compressed once rather than per request."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self._cache = TTLCache(ttl, maxsize=maxsize)
+
+    def invalidate(self, key):
+        self._cache.invalidate(key)
+
+    async def response(self, request: Request, key, build, media_type: str = "application/json") -> Response:
+        """`build` is an async callable returning the uncompressed body."""
+        entry = self._cache.get(key)
+        if entry is None:
+            body = await build()
+            entry = {"identity": body, "etag": '"' + hashlib.sha1(body).hexdigest()[:20] + '"'}
+            self._cache.set(key, entry)
+
+        encoding = None
+        if len(entry["identity"]) >= settings.COMPRESSION_MIN_BYTES:
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        # each encoding is its own representation, so it gets its own tag
+        etag = entry["etag"] if encoding is None else f'{entry["etag"][:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is None:
+            return Response(entry["identity"], media_type=media_type, headers=headers)
+        if encoding not in entry:
+            entry[encoding] = await compress_async(entry["identity"], encoding)
+        headers["Content-Encoding"] = encoding
+        return Response(entry[encoding], media_type=media_type, headers=headers)
@@ -1,20 +1,205 @@
+import asyncio
+import hashlib
+import itertools
+import time
+from functools import cached_property
+from fastapi import HTTPException, Request
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from core.cache import TTLCache
 from core.config import settings
+from core.tokens import token_validator
 
 # create Base
 Base = declarative_base()
 
-# create async engine
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# one engine (and pool) per database URL, shared by every shard/schema on it;
+# created on first use, so importing the app never touches a driver or pool
+_engines = {}
 
-# session factory
-async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
 
-# dependency to get DB session
-async def get_db():
-    async with async_session() as session:
+def engine_for(url: str, **kwargs):
+    if url not in _engines:
+        _engines[url] = create_async_engine(url, echo=settings.SQL_ECHO, **kwargs)
+    return _engines[url]
+
+
+def _session_factory(engine, schema: str | None):
+    bind = engine.execution_options(schema_translate_map={None: schema}) if schema else engine
+    return sessionmaker(bind, class_=AsyncSession, expire_on_commit=False)
+
+
+class Replica:
+    def __init__(self, url: str, schema: str | None = None):
+        self.url = url
+        self.schema = schema
+        self.healthy = True
+        self.lag: float | None = None
+        self.checked_at = 0.0
+        self._checking = asyncio.Lock()
+
+    @cached_property
+    def engine(self):
+        return engine_for(self.url, pool_pre_ping=True)
+
+    @cached_property
+    def session(self):
+        return _session_factory(self.engine, self.schema)
+
+    async def check(self):
+        async with self._checking:
+            if time.monotonic() - self.checked_at < settings.REPLICA_HEALTH_CHECK_SECONDS:
+                return
+            try:
+                async with self.engine.connect() as conn:
+                    if conn.dialect.name == "postgresql":
+                        result = await conn.execute(text(
+                            "SELECT CASE WHEN pg_is_in_recovery() "
+                            "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+                            "ELSE 0 END"
+                        ))
+                        lag = result.scalar()
+                        self.lag = float(lag) if lag is not None else None
+                    else:
+                        await conn.execute(text("SELECT 1"))
+                        self.lag = 0.0
+                self.healthy = self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+            except Exception as e:
+                print(f"❌ Replica {self.engine.url.render_as_string()} unavailable: {e}")
+                self.healthy = False
+            self.checked_at = time.monotonic()
+
+
+class Shard:
+    """Primary database (optionally a schema inside it) plus its read replicas."""
+
+    def __init__(self, url: str, schema: str | None = None, replica_urls: list[str] = ()):
+        self.url = url
+        self.schema = schema
+        self.replicas = [Replica(u, schema) for u in replica_urls]
+        self._next_replica = itertools.count()
+
+    @cached_property
+    def engine(self):
+        return engine_for(self.url)
+
+    @cached_property
+    def session(self):
+        return _session_factory(self.engine, self.schema)
+
+    async def pick_replica(self) -> Replica | None:
+        if not self.replicas:
+            return None
+        stale = [
+            r for r in self.replicas
+            if time.monotonic() - r.checked_at >= settings.REPLICA_HEALTH_CHECK_SECONDS
+        ]
+        if stale:
+            await asyncio.gather(*(r.check() for r in stale))
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next_replica) % len(healthy)]
+
+
+default_shard = Shard(settings.DATABASE_URL, replica_urls=settings.DATABASE_REPLICA_URLS)
+
+# tenant -> shard; only the default tenant lives in DATABASE_URL's default schema
+shards = {settings.DEFAULT_TENANT: default_shard}
+for _tenant in set(settings.TENANT_DATABASES) | set(settings.TENANT_SCHEMAS):
+    shards[_tenant] = Shard(
+        settings.TENANT_DATABASES.get(_tenant, settings.DATABASE_URL),
+        schema=settings.TENANT_SCHEMAS.get(_tenant),
+    )
+
+replicas = default_shard.replicas
+
+
+# default shard's engine/sessionmaker, kept under the names the rest of the app
+# and tooling use, and built on first access
+def __getattr__(name):
+    if name == "engine":
+        return default_shard.engine
+    if name == "async_session":
+        return default_shard.session
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# clients that wrote recently read from the primary until replicas catch up
+recent_writers = TTLCache(settings.READ_YOUR_WRITES_SECONDS, maxsize=100_000)
+
+
+def client_key(request: Request) -> str:
+    auth = request.headers.get("authorization")
+    if auth:
+        return hashlib.sha1(auth.encode()).hexdigest()
+    return request.client.host if request.client else "anonymous"
+
+
+def resolve_tenant(request: Request) -> str:
+    """Tenant from the bearer token's claim, else the request's host
+    (TENANT_HOSTS), else the default. Without a token, X-Tenant may only pick a
+    tenant listed in TENANT_HEADER_TENANTS, so registration cannot be pointed
+    at any school. An invalid token is ignored here; get_current_user rejects it."""
+    tenant = getattr(request.state, "tenant", None)
+    if tenant:
+        return tenant
+
+    claimed = None
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        try:
+            claimed = token_validator.validate(auth[7:]).get("tenant")
+        except HTTPException:
+            pass
+    header = request.headers.get("x-tenant")
+    if claimed and header and header != claimed:
+        raise HTTPException(status_code=403, detail="Token does not belong to this tenant")
+
+    if not claimed and header and header not in settings.TENANT_HEADER_TENANTS:
+        raise HTTPException(status_code=403, detail="Tenant cannot be selected by header")
+
+    tenant = claimed or header or settings.TENANT_HOSTS.get(request.url.hostname or "", settings.DEFAULT_TENANT)
+    if tenant not in shards:
+        raise HTTPException(status_code=400, detail="Unknown tenant")
+    request.state.tenant = tenant
+    return tenant
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_commit(session):
+    session.info["committed"] = True
+
+
+# dependency to get DB session (tenant's primary, for anything that writes)
+async def get_db(request: Request):
+    tenant = resolve_tenant(request)
+    async with shards[tenant].session() as session:
+        session.info["tenant"] = tenant
         yield session
+        if session.info.get("committed"):
+            recent_writers.set(client_key(request), True)
+
+
+# a healthy replica when one is configured, the primary otherwise or right
+# after this client's own writes
+async def read_session_factory(request: Request):
+    shard = shards[resolve_tenant(request)]
+    replica = None
+    if not recent_writers.get(client_key(request)):
+        replica = await shard.pick_replica()
+    return replica.session if replica else shard.session
+
+
+# dependency for read-only routes
+async def get_read_db(request: Request):
+    factory = await read_session_factory(request)
+    async with factory() as session:
+        session.info["tenant"] = resolve_tenant(request)
+        yield session
+
+
+async def dispose_engines():
+    for pool in _engines.values():
+        await pool.dispose()
@@ -0,0 +1,287 @@
+import bisect
+import functools
+import inspect
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from core.config import settings
+
+logger = logging.getLogger("readiq.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+MAX_RECORDED_STATEMENTS = 200
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = Lock()
+        registry.append(self)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        names = self.label_names + ("le",)
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+registry: list[_Metric] = []
+
+REQUESTS = Counter(
+    "readiq_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+REQUEST_LATENCY = Histogram(
+    "readiq_http_request_duration_seconds", "End-to-end request latency.", ("method", "route")
+)
+REQUEST_STATEMENTS = Histogram(
+    "readiq_http_request_db_statements", "SQL statements executed per request.",
+    ("method", "route"), buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "readiq_http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route")
+)
+PHASE_TIME = Histogram(
+    "readiq_http_request_phase_seconds", "Time spent per request phase (auth, hash, serialize).",
+    ("method", "route", "phase"),
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = perf_counter()
+        self.statement_count = 0
+        self.db_time = 0.0
+        self.statements: list[tuple[str, float]] = []
+        self.phases: dict[str, float] = {}
+        self.endpoint_done: float | None = None
+        # filled in only when the query guard asks for it (see core.query_guard)
+        self.query_budget: int | None = None
+        self.track_repeats = False
+        self.by_statement: dict[str, int] = {}
+        self.by_call: dict[tuple[str, str], int] = {}
+
+    def add_statement(self, statement: str, elapsed: float, parameters=None):
+        self.statement_count += 1
+        self.db_time += elapsed
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, elapsed))
+        if self.track_repeats:
+            self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+            call = (statement, repr(parameters))
+            self.by_call[call] = self.by_call.get(call, 0) + 1
+
+    def add_phase(self, name: str, elapsed: float):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_phase(name, perf_counter() - started)
+
+
+# ---- SQLAlchemy hooks (registered on every engine, primary or not) -------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.add_statement(statement, perf_counter() - started, parameters)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+# ---- ASGI middleware and route class ----------------------------------------
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            self._record(scope, stats, status_code, perf_counter() - stats.started)
+
+    def _record(self, scope, stats: RequestStats, status_code: int, elapsed: float):
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+        REQUESTS.inc(method, route, str(status_code))
+        REQUEST_LATENCY.observe(method, route, value=elapsed)
+        REQUEST_STATEMENTS.observe(method, route, value=stats.statement_count)
+        REQUEST_DB_TIME.observe(method, route, value=stats.db_time)
+        for name, spent in stats.phases.items():
+            PHASE_TIME.observe(method, route, name, value=spent)
+
+        if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning(
+                "slow request %s %s -> %s in %.1fms (%d statements, %.1fms db, phases %s)\n%s",
+                method, route, status_code, elapsed * 1000, stats.statement_count,
+                stats.db_time * 1000,
+                {name: round(spent * 1000, 1) for name, spent in stats.phases.items()},
+                "\n".join(f"  [{spent * 1000:.1f}ms] {sql}" for sql, spent in stats.statements),
+            )
+
+
+def _mark_endpoint_done(endpoint):
+    @functools.wraps(endpoint)
+    async def async_endpoint(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            stats = current_request.get()
+            if stats is not None:
+                stats.endpoint_done = perf_counter()
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            stats = current_request.get()
+            if stats is not None:
+                stats.endpoint_done = perf_counter()
+
+    return async_endpoint if inspect.iscoroutinefunction(endpoint) else sync_endpoint
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that attributes the time between the endpoint returning and the
+    response being ready (response_model validation + JSON encoding) to the
+    "serialize" phase."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = current_request.get()
+            if stats is not None and stats.endpoint_done is not None:
+                stats.add_phase("serialize", perf_counter() - stats.endpoint_done)
+            return response
+
+        return timed_handler
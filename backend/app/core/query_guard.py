@@ -0,0 +1,75 @@
+import logging
+import math
+from fastapi import Request
+from core.config import settings
+from core.metrics import Counter, current_request
+
+logger = logging.getLogger("readiq.query_guard")
+
+VIOLATIONS = Counter(
+    "readiq_query_guard_violations_total",
+    "Requests that broke their query budget or repeated statements.",
+    ("route", "kind"),
+)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit: int):
+    """Route dependency declaring how many SQL statements the route may run,
+    e.g. `dependencies=[Depends(query_budget(3))]`."""
+    async def declare_budget():
+        stats = current_request.get()
+        if stats is not None:
+            stats.query_budget = limit
+    return declare_budget
+
+
+async def bulk_queries():
+    """Route dependency for bulk endpoints whose statement count grows with the
+    payload (imports, exports): no budget and no repeat detection."""
+    stats = current_request.get()
+    if stats is not None:
+        stats.query_budget = math.inf
+        stats.track_repeats = False
+
+
+def _violations(stats) -> list[tuple[str, str]]:
+    found = []
+    budget = settings.QUERY_GUARD_DEFAULT_BUDGET if stats.query_budget is None else stats.query_budget
+    if stats.statement_count > budget:
+        found.append(("budget", f"{stats.statement_count} statements, budget {budget}"))
+    for statement, count in stats.by_statement.items():
+        if count >= settings.QUERY_GUARD_REPEAT_LIMIT:
+            found.append(("n_plus_one", f"{count}x {statement}"))
+    for (statement, parameters), count in stats.by_call.items():
+        if count > 1:
+            found.append(("duplicate", f"{count}x {statement} {parameters}"))
+    return found
+
+
+async def guard_queries(request: Request):
+    """App-wide dependency: counts statements for the whole request and checks
+    them against the route's budget once the endpoint has finished."""
+    stats = current_request.get()
+    if settings.QUERY_GUARD == "off" or stats is None:
+        yield
+        return
+
+    stats.track_repeats = True
+    yield
+
+    found = _violations(stats)
+    if not found:
+        return
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    for kind, _ in found:
+        VIOLATIONS.inc(route, kind)
+    message = f"query guard: {request.method} {route}\n" + "\n".join(
+        f"  [{kind}] {detail}" for kind, detail in found
+    )
+    if settings.QUERY_GUARD == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -2,15 +2,18 @@ from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 from core.config import settings
+from core.metrics import phase
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with phase("hash"):
+        return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     print(f"🔍 VERIFY plain='{plain_password}', hash='{hashed_password}'")
-    return pwd_context.verify(plain_password, hashed_password)
+    with phase("hash"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=30)):
     to_encode = data.copy()
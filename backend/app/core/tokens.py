@@ -0,0 +1,74 @@
+import hashlib
+import time
+from fastapi import HTTPException
+from jose import jwt, JWTError
+from core.config import settings
+
+
+class TokenValidator:
+    """Verifies access tokens once and serves the claims from memory until the
+    token expires.
+
+    Revocation is a per-user generation counter: tokens carry the generation
+    they were issued with (`gen` claim) and stop validating once the user's
+    generation moves past it (logout, password change, deactivation). The
+    counter lives on the users table; this process also remembers the highest
+    generation it has seen so claims-only callers need no DB round trip.
+    """
+
+    def __init__(self, secret: str, algorithm: str = "HS256", maxsize: int = 100_000):
+        self.secret = secret
+        self.algorithm = algorithm
+        self.maxsize = maxsize
+        # sha256(token) -> (exp timestamp, claims); insertion order ~ issue order
+        self._verified: dict[bytes, tuple[float, dict]] = {}
+        # (tenant, user id) -> lowest generation still accepted
+        self._generations: dict[tuple[str, int], int] = {}
+
+    def _decode(self, token: str) -> dict:
+        try:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    def validate(self, token: str) -> dict:
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self._verified.get(digest)
+        if cached is not None and cached[0] > time.time():
+            claims = cached[1]
+        else:
+            if cached is not None:
+                del self._verified[digest]
+            claims = self._decode(token)
+            if claims.get("sub") is None or claims.get("role") is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            exp = claims.get("exp")
+            if exp is not None:
+                if len(self._verified) >= self.maxsize:
+                    del self._verified[next(iter(self._verified))]
+                self._verified[digest] = (float(exp), claims)
+
+        if self.is_revoked(claims):
+            raise HTTPException(status_code=401, detail="Token has been revoked")
+        return claims
+
+    def _user_key(self, claims: dict) -> tuple[str, int] | None:
+        user_id = claims.get("id")
+        if user_id is None:
+            return None
+        return claims.get("tenant", settings.DEFAULT_TENANT), user_id
+
+    def is_revoked(self, claims: dict) -> bool:
+        key = self._user_key(claims)
+        if key is None:
+            return False
+        return claims.get("gen", 0) < self._generations.get(key, 0)
+
+    def revoke_user(self, tenant: str, user_id: int, generation: int):
+        """Reject every token of this user issued before `generation`."""
+        key = (tenant, user_id)
+        if generation > self._generations.get(key, 0):
+            self._generations[key] = generation
+
+
+token_validator = TokenValidator(settings.JWT_SECRET)
@@ -0,0 +1,56 @@
+import asyncio
+from contextlib import AsyncExitStack
+from time import perf_counter
+from fastapi import FastAPI
+from sqlalchemy import text
+from core.config import settings
+from core.database import shards
+from core.security import pwd_context
+from services.email_utils import connect_mail
+
+
+async def _fill_pool(engine, connections: int):
+    # hold them all at once so the pool really opens `connections` of them
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
+
+async def warm_pools():
+    engines = {}
+    for shard in shards.values():
+        engines[shard.url] = shard.engine
+        for replica in shard.replicas:
+            engines[replica.url] = replica.engine
+    await asyncio.gather(*(_fill_pool(e, settings.WARMUP_POOL_CONNECTIONS) for e in engines.values()))
+    # first replica health check, so the first read does not pay for it
+    await asyncio.gather(*(shard.pick_replica() for shard in shards.values()))
+
+
+async def warm_up(app: FastAPI):
+    """Pay the first-request costs before the worker takes traffic: database
+    pools, replica health, the OpenAPI schema, the bcrypt backend and the
+    SMTP login. Failures are logged and left to the first real request."""
+    timings = {}
+
+    async def step(name, work):
+        started = perf_counter()
+        try:
+            await work()
+        except Exception as e:
+            print(f"❌ Warmup step {name} failed: {e}")
+        timings[name] = round((perf_counter() - started) * 1000, 1)
+
+    async def schema():
+        app.openapi()
+        pwd_context.handler("bcrypt").get_backend()
+
+    async def mail():
+        await asyncio.wait_for(connect_mail(), settings.WARMUP_MAIL_TIMEOUT_SECONDS)
+
+    await step("db", warm_pools)
+    await step("schema", schema)
+    await step("mail", mail)
+    print(f"✅ Warmup done: {timings} ms")
+    return timings
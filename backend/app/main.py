@@ -1,33 +1,102 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from core.admission import AdmissionMiddleware
+from core.compression import CompressionMiddleware
 from core.config import settings
+from core.database import dispose_engines, shards
+from core.metrics import MetricsMiddleware
+from core.query_guard import guard_queries
+from core.warmup import warm_up
+from services import archive, epub, family_export
+from services.email_utils import close_mail
+from services.leaderboard import leaderboards
+
+from routes import auth, protected, progress, students, courses, enrollment, reading, recommendations, leaderboard, telemetry, exports, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Debug print to confirm .env loaded
+    # print("✅ BREVO login loaded from env:", settings.BREVO_LOGIN)
+    print("✅ Gmail loaded from env:", settings.EMAIL_FROM)
+    if settings.STARTUP_WARMUP:
+        await warm_up(app)
+
+    await leaderboards.restore()
+    for tenant in shards:
+        epub.resume_pending(reading.books_dir(tenant), reading.upload_dir(tenant))
+    family_export.fail_interrupted()
+    snapshots = archival = None
+    if settings.LEADERBOARD_SNAPSHOT_SECONDS:
+        snapshots = asyncio.create_task(leaderboards.run_periodically())
+    if settings.PROGRESS_ARCHIVE_INTERVAL_SECONDS:
+        archival = asyncio.create_task(archive.run_periodically())
+    yield
+    if archival:
+        archival.cancel()
+    if snapshots:
+        snapshots.cancel()
+        leaderboards.save()
+    await epub.stop_worker()
+    await close_mail()
+    await dispose_engines()
+
 
-from routes import auth, protected, progress, students, courses, enrollment, reading
-
-app = FastAPI(title="ReadIQ API")
-
-# Debug print to confirm .env loaded
-# print("✅ BREVO login loaded from env:", settings.BREVO_LOGIN)
-print("✅ Gmail loaded from env:", settings.EMAIL_FROM)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# register routers
-app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
-app.include_router(protected.router, prefix="/api/protected", tags=["protected"])
-app.include_router(progress.router)
-app.include_router(students.router)
-app.include_router(courses.router)
-app.include_router(enrollment.router)
-app.include_router(reading.router)
-
-@app.get("/")
 async def root():
     return {"message": "ReadIQ API is working ✅"}
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="ReadIQ API", dependencies=[Depends(guard_queries)], lifespan=lifespan)
+
+    # rate/concurrency limits for bcrypt- and SMTP-bound routes; inside CORS so
+    # rejections still carry CORS headers
+    app.add_middleware(AdmissionMiddleware)
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # gzip/deflate; pre-compressed cached bodies pass through as they are
+    app.add_middleware(CompressionMiddleware)
+
+    # per-route latency / DB accounting, outermost so it sees the whole request
+    app.add_middleware(MetricsMiddleware)
+
+    # register routers
+    app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
+    app.include_router(protected.router, prefix="/api/protected", tags=["protected"])
+    app.include_router(progress.router)
+    app.include_router(students.router)
+    app.include_router(courses.router)
+    app.include_router(enrollment.router)
+    app.include_router(reading.router)
+    app.include_router(recommendations.router)
+    app.include_router(leaderboard.router)
+    app.include_router(telemetry.router)
+    app.include_router(exports.router)
+    app.include_router(metrics.router)
+
+    app.add_api_route("/", root, methods=["GET"])
+    return app
+
+
+# `uvicorn main:create_app --factory`; `main:app` still works and builds the
+# app on first access instead of at import
+_app = None
+
+
+def __getattr__(name):
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,7 +10,7 @@ class Progress(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
     progress_percent = Column(Float, nullable=False)
-    last_activity = Column(DateTime, server_default=func.now())
+    last_activity = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="progress_records")
     course = relationship("Course", back_populates="progress_records")
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from core.database import Base
+
+class ProgressArchive(Base):
+    """One month of a tenant's progress history moved out of the progress table
+    into a columnar file (see services.archive)."""
+    __tablename__ = "progress_archives"
+    __table_args__ = (UniqueConstraint("tenant", "month"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant = Column(String, nullable=False, index=True)
+    month = Column(String(7), nullable=False)        # e.g. "2024-03"
+    path = Column(String, nullable=False)            # .npz, relative to PROGRESS_ARCHIVE_DIR
+    version = Column(Integer, nullable=False, default=1)
+    row_count = Column(Integer, nullable=False)
+    first_activity = Column(DateTime, nullable=False)
+    last_activity = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from core.database import Base
+
+class SyncReceipt(Base):
+    """Idempotency key of a progress event already handled by /progress/sync."""
+    __tablename__ = "sync_receipts"
+    __table_args__ = (UniqueConstraint("user_id", "idempotency_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    idempotency_key = Column(String(64), nullable=False)
+    status = Column(String, nullable=False)   # applied | superseded | not_enrolled
+    received_at = Column(DateTime, server_default=func.now())
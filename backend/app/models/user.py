@@ -1,9 +1,26 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import DDL, Column, Integer, String, Boolean, ForeignKey, Index, event, select
+from core.config import settings
 from core.database import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, relationship, with_loader_criteria
+from models.enrollment import Enrollment
+from models.progress import Progress
+from models.progress_archive import ProgressArchive
+from models.sync_receipt import SyncReceipt
 
 class User(Base):
     __tablename__ = "users"
+    # trigram indexes behind user search (services.user_search); Postgres only,
+    # other databases use the in-process index
+    __table_args__ = (
+        Index(
+            "ix_users_username_trgm", "username",
+            postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False)
@@ -13,6 +30,12 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     verified = Column(Boolean, default=False)
     parent_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    tenant = Column(
+        String, nullable=False, index=True,
+        default=settings.DEFAULT_TENANT, server_default=settings.DEFAULT_TENANT,
+    )
+    # bumped on logout/deactivation; tokens carrying an older "gen" are rejected
+    token_generation = Column(Integer, nullable=False, default=0, server_default="0")
 
     progress_records = relationship(
         "Progress", back_populates="user", cascade="all, delete"
@@ -32,3 +55,24 @@ class User(Base):
     )
 
 
+event.listen(
+    User.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+# sessions from get_db/get_read_db carry their tenant; every ORM select of
+# users, and of the rows that belong to a user, is limited to it, so a
+# misrouted session can never see another school
+@event.listens_for(Session, "do_orm_execute")
+def _scope_users_to_tenant(state):
+    tenant = state.session.info.get("tenant")
+    if tenant and state.is_select and not state.is_column_load and not state.is_relationship_load:
+        tenant_users = select(User.id).where(User.tenant == tenant)
+        state.statement = state.statement.options(
+            with_loader_criteria(User, User.tenant == tenant, include_aliases=True),
+            with_loader_criteria(Enrollment, Enrollment.student_id.in_(tenant_users), include_aliases=True),
+            with_loader_criteria(Progress, Progress.user_id.in_(tenant_users), include_aliases=True),
+            with_loader_criteria(SyncReceipt, SyncReceipt.user_id.in_(tenant_users), include_aliases=True),
+            with_loader_criteria(ProgressArchive, ProgressArchive.tenant == tenant, include_aliases=True),
+        )
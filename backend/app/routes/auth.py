@@ -1,27 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from schemas.user import UserCreate, UserOut, UserLogin
 from models.user import User
-from core.database import get_db
+from core.database import get_db, resolve_tenant, shards
 from core.security import hash_password, verify_password, create_access_token
 from core.config import settings
 from jose import jwt, JWTError
 from services.email_utils import send_verification_email
+from core.metrics import TimedRoute, phase
+from core.tokens import token_validator
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
 # Helper to create email verification token
-def create_email_token(email: str):
-    return jwt.encode({"sub": email}, settings.JWT_SECRET, algorithm="HS256")
+def create_email_token(email: str, tenant: str):
+    return jwt.encode({"sub": email, "tenant": tenant}, settings.JWT_SECRET, algorithm="HS256")
 
 
 @router.post("/register", response_model=UserOut)
-async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
+async def register(user_in: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == user_in.email))
     existing_user = result.scalar_one_or_none()
     if existing_user:
@@ -30,37 +33,43 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     user = User(
         username=user_in.username,
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await run_in_threadpool(hash_password, user_in.password),
         role="student",
         is_active=True,
         verified=False,
+        tenant=resolve_tenant(request),
     )
     db.add(user)
     await db.commit()
     await db.refresh(user)
 
-    email_token = create_email_token(user.email)
+    email_token = create_email_token(user.email, user.tenant)
     await send_verification_email(user.email, email_token)
 
     return user
 
 
 @router.get("/verify-email")
-async def verify_email(token: str, db: AsyncSession = Depends(get_db)):
+async def verify_email(token: str):
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        email = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=400, detail="Invalid token")
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired token")
+    email = payload.get("sub")
+    tenant = payload.get("tenant", settings.DEFAULT_TENANT)
+    if email is None or tenant not in shards:
+        raise HTTPException(status_code=400, detail="Invalid token")
+
+    # the link is opened from a mail client, so the tenant comes from the token
+    async with shards[tenant].session() as db:
+        db.info["tenant"] = tenant
         result = await db.execute(select(User).where(User.email == email))
         user = result.scalar_one_or_none()
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         user.verified = True
         await db.commit()
-        return {"detail": "Email verified successfully"}
-    except JWTError:
-        raise HTTPException(status_code=400, detail="Invalid or expired token")
+    return {"detail": "Email verified successfully"}
 
 
 @router.post("/login")
@@ -69,14 +78,17 @@ async def login(user_in: UserLogin, db: AsyncSession = Depends(get_db)):
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    if not verify_password(user_in.password, user.hashed_password):
+    if not await run_in_threadpool(verify_password, user_in.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="This user account is deactivated")
     if not user.verified:
         raise HTTPException(status_code=401, detail="Email not verified")
 
-    token = create_access_token({"sub": user.email, "role": user.role, "id": user.id})
+    token = create_access_token(
+        {"sub": user.email, "role": user.role, "id": user.id, "tenant": user.tenant,
+         "gen": user.token_generation}
+    )
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -84,21 +96,31 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ):
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=["HS256"])
-        email: str = payload.get("sub")   # sub is email
-        role: str = payload.get("role")
-        if email is None or role is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        result = await db.execute(select(User).where(User.email == email))
+    with phase("auth"):
+        payload = token_validator.validate(token)
+        result = await db.execute(select(User).where(User.email == payload["sub"]))
         user = result.scalar_one_or_none()
         if user is None:
             raise HTTPException(status_code=404, detail="User not found")
         if not user.is_active:
             raise HTTPException(status_code=403, detail="This user account is deactivated")
+        if payload.get("gen", 0) < user.token_generation:
+            # revoked by another worker; remember it so this one skips the lookup next time
+            token_validator.revoke_user(user.tenant, user.id, user.token_generation)
+            raise HTTPException(status_code=401, detail="Token has been revoked")
         return user
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+# ends every session of the current user, on all devices
+@router.post("/logout")
+async def logout(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    current_user.token_generation += 1
+    await db.commit()
+    token_validator.revoke_user(current_user.tenant, current_user.id, current_user.token_generation)
+    return {"detail": "Logged out"}
 
 
 @router.get("/me", response_model=UserOut)
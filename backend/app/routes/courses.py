@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from models.course import Course
-from core.database import get_db
-from schemas.course import CourseCreate, CourseOut
+from core.database import get_db, get_read_db, read_session_factory, shards
+from schemas.course import CourseCreate, CourseOut, CourseImportReport
 from routes.auth import get_current_user
 from models.user import User
+from services.recommender import recommender_for
+from core.metrics import TimedRoute
+from core.query_guard import bulk_queries, query_budget
+from core.compression import CompressedBodies
+from core.config import settings
+from services.catalog import csv_records, export_catalog, import_catalog, ndjson_records
 
-router = APIRouter(prefix="/api/protected/courses", tags=["courses"])
+router = APIRouter(prefix="/api/protected/courses", tags=["courses"], route_class=TimedRoute)
+
+# serialized (and gzip/deflate) course list per tenant, dropped whenever the
+# catalog changes in this worker; other workers pick changes up within the ttl
+course_list_bodies = CompressedBodies(settings.COMPRESSED_BODY_CACHE_SECONDS, settings.COMPRESSED_BODY_CACHE_ENTRIES)
+course_list_adapter = TypeAdapter(list[CourseOut])
 
 @router.post("/", response_model=CourseOut)
 async def create_course(
@@ -30,15 +44,74 @@ async def create_course(
     db.add(course)
     await db.commit()
     await db.refresh(course)
+    recommender_for(current_user.tenant).upsert_course(course)
+    course_list_bodies.invalidate((current_user.tenant, "courses"))
     return course
 
-@router.get("/", response_model=list[CourseOut])
+@router.get("/", response_model=list[CourseOut], dependencies=[Depends(query_budget(2))])
 async def list_courses(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    async def build():
+        result = await db.execute(select(Course))
+        return course_list_adapter.dump_json(result.scalars().all())
+
+    return await course_list_bodies.response(request, (current_user.tenant, "courses"), build)
+
+# streamed CSV (header row) or NDJSON body; valid rows are written in one
+# transaction, invalid ones are reported by row number
+@router.post("/import", response_model=CourseImportReport, dependencies=[Depends(bulk_queries)])
+async def import_courses(
+    request: Request,
+    format: str | None = Query(None, pattern="^(csv|ndjson)$"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Course))
-    return result.scalars().all()
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    content_type = request.headers.get("content-type", "")
+    if format is None:
+        if "csv" in content_type:
+            format = "csv"
+        elif "ndjson" in content_type or "jsonl" in content_type:
+            format = "ndjson"
+        else:
+            raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+
+    records = csv_records if format == "csv" else ndjson_records
+    try:
+        report = await import_catalog(db, records(request.stream()), shards[current_user.tenant].schema)
+        await db.commit()
+    except (DBAPIError, ValueError) as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Import failed, nothing was saved: {getattr(e, 'orig', e)}")
+
+    recommender_for(current_user.tenant).invalidate()
+    course_list_bodies.invalidate((current_user.tenant, "courses"))
+    return report
+
+
+@router.get("/export", dependencies=[Depends(bulk_queries)])
+async def export_courses(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+
+    # the stream outlives the request's dependencies, so it opens its own session
+    factory = await read_session_factory(request)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_catalog(factory, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=courses.{format}"},
+    )
+
 
 @router.put("/{course_id}", response_model=CourseOut)
 async def edit_course(
@@ -67,6 +140,8 @@ async def edit_course(
 
     await db.commit()
     await db.refresh(course)
+    recommender_for(current_user.tenant).upsert_course(course)
+    course_list_bodies.invalidate((current_user.tenant, "courses"))
     return course
 
 
@@ -87,4 +162,6 @@ async def delete_course(
 
     await db.delete(course)
     await db.commit()
+    recommender_for(current_user.tenant).remove_course(course_id)
+    course_list_bodies.invalidate((current_user.tenant, "courses"))
     return {"detail": "Course deleted successfully"}
@@ -1,16 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from core.database import get_db
+from core.database import get_db, get_read_db
 from models.enrollment import Enrollment
 from models.course import Course
 from models.user import User
 from schemas.enrollment import EnrollmentCreate, EnrollmentOut
 from routes.auth import get_current_user
+from routes.students import dashboard_cache
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
 
-router = APIRouter(prefix="/api/protected/enrollments", tags=["enrollments"])
+router = APIRouter(prefix="/api/protected/enrollments", tags=["enrollments"], route_class=TimedRoute)
 
-@router.post("/", response_model=EnrollmentOut)
+@router.post("/", response_model=EnrollmentOut, dependencies=[Depends(query_budget(6))])
 async def enroll_student(
     data: EnrollmentCreate,
     current_user: User = Depends(get_current_user),
@@ -52,27 +55,26 @@ async def enroll_student(
     db.add(enrollment)
     await db.commit()
     await db.refresh(enrollment)
+    dashboard_cache.invalidate((current_user.tenant, student.parent_id))
     return enrollment
 
 
-@router.get("/{student_id}", response_model=list[EnrollmentOut])
+@router.get("/{student_id}", response_model=list[EnrollmentOut], dependencies=[Depends(query_budget(3))])
 async def list_enrollments(
     student_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    # allow admin to view any, parents/teachers only their students
+    # allow admin to view any in their school, parents/teachers only their students
+    query = select(User).where(User.id == student_id)
     if current_user.role in ["parent", "teacher"]:
-        student_check = await db.execute(
-            select(User).where(User.id == student_id, User.parent_id == current_user.id)
-        )
-        student = student_check.scalar_one_or_none()
-        if not student:
-            raise HTTPException(status_code=404, detail="Student not found or not yours.")
-    elif current_user.role == "admin":
-        pass
-    else:
+        query = query.where(User.parent_id == current_user.id)
+    elif current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
+    student_check = await db.execute(query)
+    student = student_check.scalar_one_or_none()
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found or not yours.")
 
     result = await db.execute(
         select(Enrollment).where(Enrollment.student_id == student_id)
@@ -95,14 +97,18 @@ async def unenroll_student(
         raise HTTPException(status_code=404, detail="Enrollment not found")
 
     # extra: parents/teachers can only unenroll their students
+    query = select(User).where(User.id == enrollment.student_id)
     if current_user.role in ["parent", "teacher"]:
-        student_check = await db.execute(
-            select(User).where(User.id == enrollment.student_id, User.parent_id == current_user.id)
-        )
-        student = student_check.scalar_one_or_none()
-        if not student:
+        query = query.where(User.parent_id == current_user.id)
+    student_check = await db.execute(query)
+    student = student_check.scalar_one_or_none()
+    if not student:
+        if current_user.role in ["parent", "teacher"]:
             raise HTTPException(status_code=403, detail="Not authorized to remove this enrollment")
+        raise HTTPException(status_code=404, detail="Enrollment not found")
 
     await db.delete(enrollment)
     await db.commit()
+    # the guardian's dashboard lists this enrollment
+    dashboard_cache.invalidate((current_user.tenant, student.parent_id))
     return {"detail": "Unenrolled successfully"}
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from models.user import User
+from core.database import read_session_factory
+from routes.auth import get_current_user
+from routes.reading import upload_dir
+from schemas.export import ExportJobOut
+from services import family_export
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+
+router = APIRouter(prefix="/api/protected/exports", tags=["exports"], route_class=TimedRoute)
+
+
+def _guardian(current_user: User):
+    if current_user.role not in ["parent", "teacher"]:
+        raise HTTPException(status_code=403, detail="Only parents and teachers can export their students' data")
+
+
+def _own_job(current_user: User, job_id: str) -> dict:
+    job = family_export.read_job(current_user.tenant, job_id)
+    if job is None or job["guardian_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
+
+
+# the archive is built in the background (services.family_export); poll the
+# status, then download
+@router.post("/", response_model=ExportJobOut, status_code=202, dependencies=[Depends(query_budget(1))])
+async def start_export(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    _guardian(current_user)
+    await run_in_threadpool(family_export.prune, current_user.tenant)
+    if family_export.active_job(current_user.tenant, current_user.id):
+        raise HTTPException(status_code=409, detail="An export is already in progress")
+    factory = await read_session_factory(request)
+    return family_export.start(factory, current_user.tenant, current_user.id, upload_dir(current_user.tenant))
+
+
+@router.get("/{job_id}", response_model=ExportJobOut, dependencies=[Depends(query_budget(1))])
+async def export_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    _guardian(current_user)
+    return _own_job(current_user, job_id)
+
+
+@router.get("/{job_id}/download", dependencies=[Depends(query_budget(1))])
+async def download_export(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    _guardian(current_user)
+    job = _own_job(current_user, job_id)
+    if job["status"] != "ready":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    # streamed from disk in chunks
+    return FileResponse(
+        family_export.archive_path(current_user.tenant, job_id),
+        media_type="application/zip",
+        filename=f"readiq-export-{job_id[:8]}.zip",
+    )
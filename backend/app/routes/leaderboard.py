@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models.user import User
+from core.database import get_read_db
+from routes.auth import get_current_user
+from schemas.leaderboard import LeaderboardEntry, StudentStreak
+from services.leaderboard import leaderboards
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+
+router = APIRouter(prefix="/api/protected/leaderboard", tags=["leaderboard"], route_class=TimedRoute)
+
+
+def _guardian_of(current_user: User, guardian_id: int | None) -> int | None:
+    if current_user.role in ["parent", "teacher"]:
+        return current_user.id
+    if current_user.role == "student":
+        return current_user.parent_id
+    if current_user.role == "admin":
+        if guardian_id is None:
+            raise HTTPException(status_code=400, detail="guardian_id is required for admins")
+        return guardian_id
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+
+# served from the in-memory boards; only usernames come from the database
+@router.get("/", response_model=list[LeaderboardEntry], dependencies=[Depends(query_budget(2))])
+async def top_readers(
+    k: int = Query(10, ge=1, le=100),
+    guardian_id: int | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    guardian = _guardian_of(current_user, guardian_id)
+    if guardian is None:
+        return []
+    board = leaderboards.board(current_user.tenant, guardian)
+    top = board.top(k)
+    if not top:
+        return []
+
+    result = await db.execute(
+        select(User.id, User.username).where(User.id.in_([s for s, _ in top]), User.parent_id == guardian)
+    )
+    names = dict(result.all())
+    return [
+        {
+            "rank": rank,
+            "student_id": student_id,
+            "username": names[student_id],
+            "points": round(points, 2),
+            "streak_days": board.streak(student_id),
+            "active_days_this_week": board.active_days_this_week(student_id),
+        }
+        for rank, (student_id, points) in enumerate(top, start=1)
+        if student_id in names
+    ]
+
+
+@router.get("/streaks", response_model=list[StudentStreak], dependencies=[Depends(query_budget(2))])
+async def class_streaks(
+    guardian_id: int | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    guardian = _guardian_of(current_user, guardian_id)
+    if guardian is None:
+        return []
+    board = leaderboards.board(current_user.tenant, guardian)
+
+    result = await db.execute(select(User.id, User.username).where(User.parent_id == guardian))
+    return [
+        {
+            "student_id": student_id,
+            "username": username,
+            "streak_days": board.streak(student_id),
+            "active_days_this_week": board.active_days_this_week(student_id),
+        }
+        for student_id, username in result.all()
+    ]
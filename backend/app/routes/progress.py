@@ -1,16 +1,27 @@
+from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from models.progress import Progress
+from models.sync_receipt import SyncReceipt
 from models.user import User
-from schemas.progress import ProgressCreate, ProgressUpdate, ProgressOut
-from core.database import get_db
+from schemas.progress import ProgressCreate, ProgressUpdate, ProgressOut, ProgressSync, ProgressSyncOut
+from core.database import get_db, get_read_db
 from routes.auth import get_current_user
+from routes.students import dashboard_cache
 from models.enrollment import Enrollment
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+from services.leaderboard import leaderboards
+from services.archive import archived_progress, merge_history
 
-router = APIRouter(prefix="/api/protected/progress", tags=["progress"])
+router = APIRouter(prefix="/api/protected/progress", tags=["progress"], route_class=TimedRoute)
 
-@router.post("/", response_model=ProgressOut)
+MAX_SYNC_EVENTS = 500
+
+@router.post("/", response_model=ProgressOut, dependencies=[Depends(query_budget(4))])
 async def create_progress(
     data: ProgressCreate,
     current_user: User = Depends(get_current_user),
@@ -34,54 +45,66 @@ async def create_progress(
     db.add(new_progress)
     await db.commit()
     await db.refresh(new_progress)
+    dashboard_cache.invalidate((current_user.tenant, current_user.parent_id))
+    leaderboards.record(
+        current_user.tenant, current_user.parent_id, current_user.id,
+        new_progress.course_id, new_progress.progress_percent, new_progress.last_activity,
+    )
     return new_progress
 
-@router.get("/", response_model=list[ProgressOut])
+# live rows plus whatever history has been archived (see services.archive)
+@router.get("/", response_model=list[ProgressOut], dependencies=[Depends(query_budget(3))])
 async def list_progress(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(select(Progress).where(Progress.user_id == current_user.id))
-    return result.scalars().all()
+    live = result.scalars().all()
+    archived = await archived_progress(db, current_user.tenant, current_user.id)
+    return merge_history(archived, live)
 
-@router.put("/{progress_id}", response_model=ProgressOut)
+@router.put("/{progress_id}", response_model=ProgressOut, dependencies=[Depends(query_budget(4))])
 async def update_progress(
     progress_id: int,
     data: ProgressUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    # progress row and enrollment check in one query
     result = await db.execute(
-        select(Progress).where(
+        select(Progress, Enrollment.id)
+        .outerjoin(
+            Enrollment,
+            (Enrollment.student_id == Progress.user_id)
+            & (Enrollment.course_id == Progress.course_id),
+        )
+        .where(
             Progress.id == progress_id,
             Progress.user_id == current_user.id
         )
     )
-    progress = result.scalar_one_or_none()
-    if not progress:
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Progress record not found")
-    
-    # check enrollment
-    enrollment_check = await db.execute(
-        select(Enrollment).where(
-            Enrollment.student_id == current_user.id,
-            Enrollment.course_id == progress.course_id
-        )
-    )
-    enrolled = enrollment_check.scalar_one_or_none()
-    if not enrolled:
+    progress, enrollment_id = row
+    if enrollment_id is None:
         raise HTTPException(status_code=400, detail="Student not enrolled in this course")
     
     progress.progress_percent = data.progress_percent
     await db.commit()
     await db.refresh(progress)
+    dashboard_cache.invalidate((current_user.tenant, current_user.parent_id))
+    leaderboards.record(
+        current_user.tenant, current_user.parent_id, current_user.id,
+        progress.course_id, progress.progress_percent, progress.last_activity,
+    )
     return progress
 
-@router.get("/course/{course_id}", response_model=list[ProgressOut])
+@router.get("/course/{course_id}", response_model=list[ProgressOut], dependencies=[Depends(query_budget(4))])
 async def get_progress_for_course(
     course_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     # check enrollment
     result = await db.execute(
@@ -100,4 +123,104 @@ async def get_progress_for_course(
             Progress.course_id == course_id
         )
     )
-    return result.scalars().all()
+    live = result.scalars().all()
+    archived = await archived_progress(db, current_user.tenant, current_user.id, course_id)
+    return merge_history(archived, live)
+
+
+def _utc_naive(ts: datetime) -> datetime:
+    now = datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    # a tablet with a wrong clock must not pin progress in the future
+    return min(ts, now)
+
+
+# offline tablets replay their queued progress in one request; progress only
+# moves forward and every event is applied at most once per idempotency key
+@router.post("/sync", response_model=ProgressSyncOut, dependencies=[Depends(query_budget(6))])
+async def sync_progress(
+    data: ProgressSync,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    if len(data.events) > MAX_SYNC_EVENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYNC_EVENTS} events per sync")
+
+    events = {}
+    for event in data.events:
+        events.setdefault(event.idempotency_key, event)
+    if not events:
+        return {"results": [], "progress": {}}
+
+    result = await db.execute(
+        select(SyncReceipt.idempotency_key, SyncReceipt.status).where(
+            SyncReceipt.user_id == current_user.id,
+            SyncReceipt.idempotency_key.in_(events),
+        )
+    )
+    statuses = dict(result.all())
+    fresh = sorted(
+        (e for key, e in events.items() if key not in statuses),
+        key=lambda e: _utc_naive(e.client_timestamp),
+    )
+
+    # enrollment and current progress of every course in the batch, in one query
+    progress = {}
+    if fresh:
+        result = await db.execute(
+            select(Enrollment.course_id, func.max(Progress.progress_percent))
+            .outerjoin(
+                Progress,
+                (Progress.user_id == Enrollment.student_id)
+                & (Progress.course_id == Enrollment.course_id),
+            )
+            .where(
+                Enrollment.student_id == current_user.id,
+                Enrollment.course_id.in_({e.course_id for e in fresh}),
+            )
+            .group_by(Enrollment.course_id)
+        )
+        progress = dict(result.all())
+
+    new_progress, receipts = [], []
+    for event in fresh:
+        key = event.idempotency_key
+        if event.course_id not in progress:
+            statuses[key] = "not_enrolled"
+        elif progress[event.course_id] is None or event.progress_percent > progress[event.course_id]:
+            progress[event.course_id] = event.progress_percent
+            statuses[key] = "applied"
+            new_progress.append({
+                "user_id": current_user.id,
+                "course_id": event.course_id,
+                "progress_percent": event.progress_percent,
+                "last_activity": _utc_naive(event.client_timestamp),
+            })
+        else:
+            statuses[key] = "superseded"
+        receipts.append({"user_id": current_user.id, "idempotency_key": key, "status": statuses[key]})
+
+    if fresh:
+        try:
+            # executemany, one statement per table
+            if new_progress:
+                await db.execute(insert(Progress), new_progress)
+            await db.execute(insert(SyncReceipt), receipts)
+            await db.commit()
+        except IntegrityError:
+            # the same events are being synced by a concurrent request
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Sync already in progress, retry shortly")
+    if new_progress:
+        dashboard_cache.invalidate((current_user.tenant, current_user.parent_id))
+    for row in new_progress:
+        leaderboards.record(
+            current_user.tenant, current_user.parent_id, current_user.id,
+            row["course_id"], row["progress_percent"], row["last_activity"],
+        )
+
+    return {
+        "results": [{"idempotency_key": key, "status": statuses[key]} for key in events],
+        "progress": {course_id: pct for course_id, pct in progress.items() if pct is not None},
+    }
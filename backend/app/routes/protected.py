@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from models.user import User
-from core.database import get_db
+from core.database import get_db, get_read_db
 from routes.auth import get_current_user
 from schemas.user import UserOut, UserUpdate, UserUpdatePassword
 from core.security import hash_password
 from fastapi import status
-from schemas.user import UserUpdateRole
+from schemas.user import UserUpdateRole, UserSearchOut
 from typing import List
+from core.metrics import TimedRoute
+from core.tokens import token_validator
+from core.query_guard import query_budget
+from services.user_search import search_users
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/me", response_model=UserOut)
@@ -24,8 +29,11 @@ async def change_password(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    current_user.hashed_password = hash_password(data.new_password)
+    current_user.hashed_password = await run_in_threadpool(hash_password, data.new_password)
+    # tokens issued before the change stop working
+    current_user.token_generation += 1
     await db.commit()
+    token_validator.revoke_user(current_user.tenant, current_user.id, current_user.token_generation)
     return {"detail": "Password changed successfully"}
 
 
@@ -52,10 +60,29 @@ async def delete_account(
     return {"detail": "Account deleted successfully"}
 
 
+# type-ahead over username/email: admins search their tenant, guardians
+# their own students
+@router.get("/users/search", response_model=list[UserSearchOut], dependencies=[Depends(query_budget(2))])
+async def search_users_route(
+    q: str = Query(..., min_length=1, max_length=100),
+    role: str | None = None,
+    is_active: bool | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if current_user.role == "admin":
+        parent_id = None
+    elif current_user.role in ["parent", "teacher"]:
+        parent_id = current_user.id
+    else:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await search_users(db, current_user.tenant, q, limit, role, is_active, parent_id)
+
 @router.get("/users", response_model=List[UserOut])
 async def list_all_users(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -67,7 +94,7 @@ async def list_all_users(
 @router.get("/all-users", response_model=list[UserOut])
 async def list_all_users(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
@@ -109,13 +136,15 @@ async def deactivate_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.is_active = False
+    user.token_generation += 1
     await db.commit()
+    token_validator.revoke_user(user.tenant, user.id, user.token_generation)
     return {"detail": f"User {user.username} deactivated"}
 
 @router.get("/all-users", response_model=list[UserOut])
 async def list_all_users(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
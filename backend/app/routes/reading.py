@@ -1,42 +1,150 @@
+import json
 import os
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from routes.auth import get_current_user
 from models.user import User
+from core.database import get_read_db
+from core.metrics import TimedRoute
+from core.compression import CompressedBodies
+from core.config import settings
+from services import epub
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_CHUNK = 1024 * 1024
+EPUB_TYPES = {"application/epub+zip", "application/octet-stream", "application/zip"}
 
-router = APIRouter(prefix="/api/protected/reading", tags=["reading"])
+router = APIRouter(prefix="/api/protected/reading", tags=["reading"], route_class=TimedRoute)
+
+# keyed on mtime/size, so a re-upload under the same name is a new entry
+text_bodies = CompressedBodies(settings.COMPRESSED_BODY_CACHE_SECONDS, settings.COMPRESSED_BODY_CACHE_ENTRIES)
+
+
+# uploads are named <user id>_<name>, and user ids are only unique within one
+# database, so every tenant has its own folder
+def upload_dir(tenant: str) -> str:
+    return os.path.join(UPLOAD_DIR, tenant)
+
+
+def books_dir(tenant: str) -> str:
+    return os.path.join(upload_dir(tenant), "books")
+
+
+async def _check_reader(filename: str, current_user: User, db: AsyncSession):
+    """An upload is readable by its uploader, the uploader's guardian or
+    students, and the tenant's admins."""
+    owner = filename.split("_", 1)[0]
+    if not owner.isdigit():
+        raise HTTPException(status_code=404, detail="File not found")
+    owner_id = int(owner)
+    if current_user.role == "admin" or owner_id in (current_user.id, current_user.parent_id):
+        return
+    if current_user.role in ["parent", "teacher"]:
+        result = await db.execute(select(User.id).where(User.id == owner_id, User.parent_id == current_user.id))
+        if result.scalar_one_or_none() is not None:
+            return
+    raise HTTPException(status_code=404, detail="File not found")
 
 @router.post("/upload")
 async def upload_text_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
-    if file.content_type != "text/plain":
-        raise HTTPException(status_code=400, detail="Only .txt files are supported for now")
+    is_epub = file.content_type == "application/epub+zip" or (
+        file.content_type in EPUB_TYPES and (file.filename or "").lower().endswith(".epub")
+    )
+    if file.content_type != "text/plain" and not is_epub:
+        raise HTTPException(status_code=400, detail="Only .txt and .epub files are supported for now")
 
-    filename = f"{current_user.id}_{file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    filename = f"{current_user.id}_{os.path.basename(file.filename or 'upload')}"
+    file_path = os.path.join(upload_dir(current_user.tenant), filename)
+    os.makedirs(upload_dir(current_user.tenant), exist_ok=True)
 
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # copied in chunks; a book is never held in memory whole
+    tmp_path = f"{file_path}.{os.getpid()}.part"
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK):
+                size += len(chunk)
+                if size > settings.EPUB_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                f.write(chunk)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
+    if is_epub:
+        # chapters are extracted in the background; pages become readable
+        # at /books/{filename}/pages/{n} as soon as they are written
+        epub.submit(file_path, os.path.join(books_dir(current_user.tenant), filename))
+        return {"detail": "Uploaded, extracting pages", "filename": filename, "status": "processing"}
     return {"detail": "Uploaded successfully", "filename": filename}
 
 
 @router.get("/read/{filename}")
 async def read_uploaded_file(
     filename: str,
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    file_path = os.path.join(UPLOAD_DIR, filename)
+    if filename.lower().endswith(".epub"):
+        raise HTTPException(status_code=400, detail="EPUB books are read page by page from /books/{filename}/pages/{page}")
+    filename = os.path.basename(filename)
+    await _check_reader(filename, current_user, db)
+    file_path = os.path.join(upload_dir(current_user.tenant), filename)
 
-    if not os.path.exists(file_path):
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        content = f.read()
+    async def build():
+        with open(file_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        return json.dumps({"content": content}).encode()
+
+    return await text_bodies.response(request, (current_user.tenant, filename, stat.st_mtime_ns, stat.st_size), build)
 
-    return {"content": content}
+
+
+async def _book_folder(filename: str, current_user: User, db: AsyncSession) -> str:
+    filename = os.path.basename(filename)
+    try:
+        await _check_reader(filename, current_user, db)
+    except HTTPException:
+        raise HTTPException(status_code=404, detail="Book not found")
+    folder = os.path.join(books_dir(current_user.tenant), filename)
+    if epub.read_manifest(folder) is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return folder
+
+
+@router.get("/books/{filename}")
+async def book_status(
+    filename: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    folder = await _book_folder(filename, current_user, db)
+    return {**epub.read_manifest(folder), "filename": filename, "pages_ready": epub.pages_ready(folder)}
+
+
+@router.get("/books/{filename}/pages/{page}")
+async def read_book_page(
+    filename: str,
+    page: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    folder = await _book_folder(filename, current_user, db)
+    content = epub.read_page(folder, page)
+    if content is None:
+        manifest = epub.read_manifest(folder)
+        if manifest["status"] == "processing":
+            raise HTTPException(status_code=404, detail="Page not extracted yet", headers={"Retry-After": "1"})
+        raise HTTPException(status_code=404, detail="Page not found")
+    return {"page": page, "pages_ready": epub.pages_ready(folder), "content": content}
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models.user import User
+from models.course import Course
+from core.database import get_read_db
+from routes.auth import get_current_user
+from schemas.recommendation import RecommendationBatch, StudentRecommendations
+from services.recommender import recommend_for_students
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+
+router = APIRouter(prefix="/api/protected/recommendations", tags=["recommendations"], route_class=TimedRoute)
+
+MAX_BATCH = 200
+
+
+async def _check_students(student_ids: list[int], current_user: User, db: AsyncSession):
+    if current_user.role in ["parent", "teacher"]:
+        query = select(User.id).where(User.id.in_(student_ids), User.parent_id == current_user.id)
+    elif current_user.role == "admin":
+        query = select(User.id).where(User.id.in_(student_ids), User.role == "student")
+    else:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    result = await db.execute(query)
+    if set(result.scalars().all()) != set(student_ids):
+        raise HTTPException(status_code=404, detail="Student not found or not yours.")
+
+
+async def _render(db: AsyncSession, ranked: dict[int, list[tuple[int, float]]]):
+    course_ids = {course_id for picks in ranked.values() for course_id, _ in picks}
+    courses = {}
+    if course_ids:
+        result = await db.execute(select(Course).where(Course.id.in_(course_ids)))
+        courses = {c.id: c for c in result.scalars().all()}
+
+    rendered = []
+    for student_id, picks in ranked.items():
+        items = []
+        for course_id, score in picks:
+            course = courses.get(course_id)
+            if course is None:
+                continue
+            item = {c.name: getattr(course, c.name) for c in Course.__table__.columns}
+            item["score"] = round(score, 4)
+            items.append(item)
+        rendered.append({"student_id": student_id, "courses": items})
+    return rendered
+
+
+# budgets include the one-off feature matrix / signal load on a cold worker
+@router.get("/{student_id}", response_model=StudentRecommendations, dependencies=[Depends(query_budget(8))])
+async def recommend_for_student(
+    student_id: int,
+    k: int = Query(5, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    await _check_students([student_id], current_user, db)
+    ranked = await recommend_for_students(db, current_user.tenant, [student_id], k)
+    return (await _render(db, ranked))[0]
+
+
+@router.post("/batch", response_model=list[StudentRecommendations], dependencies=[Depends(query_budget(8))])
+async def recommend_for_class(
+    data: RecommendationBatch,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    student_ids = list(dict.fromkeys(data.student_ids))
+    if not student_ids:
+        return []
+    if len(student_ids) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH} students per batch")
+    if not 1 <= data.k <= 50:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 50")
+
+    await _check_students(student_ids, current_user, db)
+    ranked = await recommend_for_students(db, current_user.tenant, student_ids, data.k)
+    return await _render(db, ranked)
@@ -1,16 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
 from sqlalchemy.future import select
 from models.user import User
-from core.database import get_db
+from models.course import Course
+from models.enrollment import Enrollment
+from core.cache import TTLCache
+from core.config import settings
+from core.database import get_db, get_read_db
 from routes.auth import get_current_user
 from schemas.user import UserCreate, StudentOut
 from core.security import hash_password
 from schemas.user import StudentUpdate
 from models.progress import Progress
 from schemas.progress import ProgressOut
+from schemas.dashboard import DashboardStudent
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+from core.tokens import token_validator
+from services.archive import archived_progress, merge_history
 
-router = APIRouter(prefix="/api/protected/students", tags=["students"])
+router = APIRouter(prefix="/api/protected/students", tags=["students"], route_class=TimedRoute)
+
+# (tenant, guardian id) -> rendered dashboard, invalidated on enrollment/progress writes
+dashboard_cache = TTLCache(settings.DASHBOARD_CACHE_SECONDS)
 
 
 @router.post("/create", response_model=StudentOut)
@@ -31,23 +45,26 @@ async def create_student(
     new_student = User(
         username=data.username,
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await run_in_threadpool(hash_password, data.password),
         role="student",
         is_active=True,
         verified=True,  # parent-created accounts are auto-verified
-        parent_id=current_user.id
+        parent_id=current_user.id,
+        tenant=current_user.tenant,
     )
     db.add(new_student)
     await db.commit()
     await db.refresh(new_student)
+    dashboard_cache.invalidate((current_user.tenant, current_user.id))
     return new_student
 
 
-@router.get("/{student_id}/progress", response_model=list[ProgressOut])
+# live rows plus whatever history has been archived (see services.archive)
+@router.get("/{student_id}/progress", response_model=list[ProgressOut], dependencies=[Depends(query_budget(4))])
 async def get_student_progress(
     student_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role in ["parent", "teacher"]:
         # parents/teachers: only their own students
@@ -69,8 +86,9 @@ async def get_student_progress(
     progress_result = await db.execute(
         select(Progress).where(Progress.user_id == student_id)
     )
-    progress = progress_result.scalars().all()
-    return progress
+    live = progress_result.scalars().all()
+    archived = await archived_progress(db, current_user.tenant, student_id)
+    return merge_history(archived, live)
 
 @router.patch("/{student_id}/deactivate")
 async def deactivate_student(
@@ -96,7 +114,10 @@ async def deactivate_student(
         raise HTTPException(status_code=404, detail="Student not found or not yours.")
 
     student.is_active = False
+    student.token_generation += 1
     await db.commit()
+    token_validator.revoke_user(student.tenant, student.id, student.token_generation)
+    dashboard_cache.invalidate((current_user.tenant, student.parent_id))
     return {"detail": f"Student {student.username} deactivated."}
 
 @router.patch("/{student_id}/reactivate")
@@ -124,13 +145,14 @@ async def reactivate_student(
 
     student.is_active = True
     await db.commit()
+    dashboard_cache.invalidate((current_user.tenant, student.parent_id))
     return {"detail": f"Student {student.username} reactivated."}
 
 
-@router.get("/my-students", response_model=list[StudentOut])
+@router.get("/my-students", response_model=list[StudentOut], dependencies=[Depends(query_budget(2))])
 async def list_my_students(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role not in ["parent", "teacher", "admin"]:
         raise HTTPException(status_code=403, detail="Not authorized to view students")
@@ -138,10 +160,90 @@ async def list_my_students(
     result = await db.execute(select(User).where(User.parent_id == current_user.id))
     return result.scalars().all()
 
+@router.get("/dashboard", response_model=list[DashboardStudent], dependencies=[Depends(query_budget(3))])
+async def guardian_dashboard(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if current_user.role not in ["parent", "teacher", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized to view students")
+
+    cached = dashboard_cache.get((current_user.tenant, current_user.id))
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(User).where(User.parent_id == current_user.id))
+    students = result.scalars().all()
+    if not students:
+        return []
+
+    # latest progress row per (student, course)
+    ranked = (
+        select(
+            Progress.user_id,
+            Progress.course_id,
+            Progress.progress_percent,
+            Progress.last_activity,
+            func.row_number().over(
+                partition_by=(Progress.user_id, Progress.course_id),
+                order_by=(Progress.last_activity.desc(), Progress.id.desc()),
+            ).label("rn"),
+        )
+        .where(Progress.user_id.in_([s.id for s in students]))
+        .subquery()
+    )
+    latest = select(ranked).where(ranked.c.rn == 1).subquery()
+
+    # enrollments + course details + latest progress in a single round trip
+    rows = await db.execute(
+        select(
+            Enrollment.student_id,
+            Enrollment.assigned_on,
+            Course.id,
+            Course.title,
+            Course.reading_level,
+            latest.c.progress_percent,
+            latest.c.last_activity,
+        )
+        .join(Course, Course.id == Enrollment.course_id)
+        .outerjoin(
+            latest,
+            (latest.c.user_id == Enrollment.student_id)
+            & (latest.c.course_id == Enrollment.course_id),
+        )
+        .where(Enrollment.student_id.in_([s.id for s in students]))
+        .order_by(Enrollment.student_id, Enrollment.assigned_on)
+    )
+
+    courses_by_student: dict[int, list[dict]] = {s.id: [] for s in students}
+    for row in rows:
+        courses_by_student[row.student_id].append({
+            "course_id": row.id,
+            "title": row.title,
+            "reading_level": row.reading_level,
+            "assigned_on": row.assigned_on,
+            "progress_percent": row.progress_percent,
+            "last_activity": row.last_activity,
+        })
+
+    dashboard = [
+        DashboardStudent(
+            id=s.id,
+            username=s.username,
+            email=s.email,
+            role=s.role,
+            is_active=s.is_active,
+            courses=courses_by_student[s.id],
+        )
+        for s in students
+    ]
+    dashboard_cache.set((current_user.tenant, current_user.id), dashboard)
+    return dashboard
+
 @router.get("/", response_model=list[StudentOut])
 async def list_all_students(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
@@ -175,5 +277,6 @@ async def edit_student(
     student.email = data.email
 
     await db.commit()
+    dashboard_cache.invalidate((current_user.tenant, student.parent_id))
     await db.refresh(student)
     return student
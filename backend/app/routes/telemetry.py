@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models.enrollment import Enrollment
+from models.user import User
+from core.database import get_read_db
+from routes.auth import get_current_user
+from routes.reading import upload_dir
+from schemas.telemetry import FluencyStats, TelemetryAccepted, TelemetryBatch
+from services.telemetry import COLUMNS, telemetry_store, text_key
+from core.metrics import TimedRoute
+from core.query_guard import query_budget
+
+router = APIRouter(prefix="/api/protected/telemetry", tags=["telemetry"], route_class=TimedRoute)
+
+MAX_TELEMETRY_EVENTS = 20_000
+
+
+def _epoch_ms(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+
+# page turns are written to the per-day column store (services.telemetry),
+# not to the database; one query checks the batch's course enrollments
+@router.post("/sessions", response_model=TelemetryAccepted, dependencies=[Depends(query_budget(2))])
+async def ingest_sessions(
+    data: TelemetryBatch,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students send reading telemetry")
+    total = sum(len(s.pages) for s in data.sessions)
+    if total > MAX_TELEMETRY_EVENTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_TELEMETRY_EVENTS} page turns per batch")
+
+    course_ids = {s.course_id for s in data.sessions if s.course_id is not None}
+    if course_ids:
+        result = await db.execute(
+            select(Enrollment.course_id).where(
+                Enrollment.student_id == current_user.id, Enrollment.course_id.in_(course_ids)
+            )
+        )
+        missing = course_ids - set(result.scalars().all())
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Not enrolled in courses {sorted(missing)}")
+    for filename in {s.filename for s in data.sessions if s.filename is not None}:
+        if os.path.basename(filename) != filename or not os.path.exists(os.path.join(upload_dir(current_user.tenant), filename)):
+            raise HTTPException(status_code=400, detail=f"Unknown file {filename}")
+
+    now_ms = _epoch_ms(datetime.now(timezone.utc))
+    parts = []
+    for s in data.sessions:
+        if not s.pages:
+            continue
+        offsets = np.asarray(s.offsets_ms, dtype=np.int64)
+        pages = np.asarray(s.pages, dtype=np.int64)
+        words = np.asarray(s.words, dtype=np.int64)
+        if offsets[0] < 0 or (np.diff(offsets) < 0).any():
+            raise HTTPException(status_code=400, detail=f"Session {s.session_id}: offsets_ms must be non-decreasing")
+        if (pages < 0).any() or (words < 0).any():
+            raise HTTPException(status_code=400, detail=f"Session {s.session_id}: negative page or word count")
+        n = len(offsets)
+        parts.append({
+            "user_id": np.full(n, current_user.id),
+            "session": np.full(n, text_key(s.session_id)),
+            "course_id": np.full(n, s.course_id if s.course_id is not None else -1),
+            "text_id": np.full(n, text_key(s.filename) if s.filename is not None else 0),
+            # a tablet with a wrong clock must not write into future days
+            "ts_ms": np.minimum(_epoch_ms(s.started_at) + offsets, now_ms),
+            "page": pages,
+            "dwell_ms": np.minimum(np.diff(offsets, prepend=0), np.iinfo(np.int32).max),
+            "words": words,
+        })
+    if parts:
+        columns = {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+        await run_in_threadpool(telemetry_store.append, current_user.tenant, columns)
+    return {"sessions": len(data.sessions), "events": total}
+
+
+# words per minute and time on page over the last `days` days (today included)
+@router.get("/fluency", response_model=list[FluencyStats], dependencies=[Depends(query_budget(2))])
+async def fluency(
+    days: int = Query(7, ge=1, le=366),
+    student_id: int | None = None,
+    course_id: int | None = None,
+    filename: str | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if current_user.role == "student":
+        student_ids = [current_user.id]
+    elif current_user.role in ["parent", "teacher"]:
+        query = select(User.id).where(User.parent_id == current_user.id)
+        if student_id is not None:
+            query = query.where(User.id == student_id)
+        result = await db.execute(query)
+        student_ids = result.scalars().all()
+        if student_id is not None and not student_ids:
+            raise HTTPException(status_code=404, detail="Student not found or not yours")
+    elif current_user.role == "admin":
+        if student_id is None:
+            raise HTTPException(status_code=400, detail="student_id is required for admins")
+        student_ids = [student_id]
+    else:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not student_ids:
+        return []
+
+    last = datetime.now(timezone.utc).date()
+    stats = await run_in_threadpool(
+        telemetry_store.fluency, current_user.tenant, list(student_ids), last - timedelta(days=days - 1), last,
+        course_id, text_key(filename) if filename is not None else None,
+    )
+    return [{"student_id": sid, **values} for sid, values in stats.items()]
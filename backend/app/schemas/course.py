@@ -15,3 +15,14 @@ class CourseOut(CourseCreate):
 
     class Config:
         from_attributes = True
+
+class CourseImportError(BaseModel):
+    row: int            # line the record starts on (CSV header is line 1)
+    errors: list[str]
+
+class CourseImportReport(BaseModel):
+    created: int
+    upserted: int       # rows with an id: that course was inserted or replaced
+    failed: int
+    errors: list[CourseImportError]
+    errors_truncated: bool
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+from schemas.user import StudentOut
+
+class DashboardCourse(BaseModel):
+    course_id: int
+    title: str
+    reading_level: str | None = None
+    assigned_on: datetime | None = None
+    progress_percent: float | None = None   # latest progress, None if not started
+    last_activity: datetime | None = None
+
+class DashboardStudent(StudentOut):
+    courses: list[DashboardCourse] = []
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+class ExportJobOut(BaseModel):
+    id: str
+    status: str                       # queued | running | ready | failed
+    created_at: float
+    finished_at: float | None
+    counts: dict[str, int] | None     # rows / files written per part
+    size: int | None                  # bytes of the finished archive
+    error: str | None
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+class StudentStreak(BaseModel):
+    student_id: int
+    username: str
+    streak_days: int            # consecutive days with reading, up to today
+    active_days_this_week: int
+
+class LeaderboardEntry(StudentStreak):
+    rank: int
+    points: float               # progress percent gained this week
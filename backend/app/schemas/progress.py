@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class ProgressCreate(BaseModel):
@@ -17,3 +17,20 @@ class ProgressOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+class ProgressEvent(BaseModel):
+    course_id: int
+    progress_percent: float
+    client_timestamp: datetime
+    idempotency_key: str = Field(min_length=1, max_length=64)
+
+class ProgressSync(BaseModel):
+    events: list[ProgressEvent]
+
+class SyncEventResult(BaseModel):
+    idempotency_key: str
+    status: str   # applied | superseded | not_enrolled (replayed keys repeat their first status)
+
+class ProgressSyncOut(BaseModel):
+    results: list[SyncEventResult]
+    progress: dict[int, float]   # course_id -> progress after the merge
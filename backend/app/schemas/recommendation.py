@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from schemas.course import CourseOut
+
+class RecommendedCourse(CourseOut):
+    score: float
+
+class StudentRecommendations(BaseModel):
+    student_id: int
+    courses: list[RecommendedCourse]
+
+class RecommendationBatch(BaseModel):
+    student_ids: list[int]
+    k: int = 5
@@ -0,0 +1,37 @@
+from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+
+class ReadingSession(BaseModel):
+    session_id: str = Field(min_length=1, max_length=64)
+    course_id: int | None = None
+    filename: str | None = None     # an uploaded text (routes/reading)
+    started_at: datetime
+    # parallel arrays, one entry per page turn
+    offsets_ms: list[int]           # turn time, ms since started_at, non-decreasing
+    pages: list[int]                # page turned away from
+    words: list[int]                # words on that page
+
+    @model_validator(mode="after")
+    def check_arrays(self):
+        if (self.course_id is None) == (self.filename is None):
+            raise ValueError("give exactly one of course_id or filename")
+        if not len(self.offsets_ms) == len(self.pages) == len(self.words):
+            raise ValueError("offsets_ms, pages and words must have the same length")
+        return self
+
+class TelemetryBatch(BaseModel):
+    sessions: list[ReadingSession]
+
+class TelemetryAccepted(BaseModel):
+    sessions: int
+    events: int
+
+class FluencyStats(BaseModel):
+    student_id: int
+    pages: int
+    words: int
+    reading_seconds: float
+    words_per_minute: float
+    avg_seconds_per_page: float
+    median_seconds_per_page: float
+    active_days: int
@@ -38,6 +38,14 @@ class StudentOut(BaseModel):
     class Config:
         from_attributes = True
 
+class UserSearchOut(BaseModel):
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+    parent_id: int | None
+
 class StudentUpdate(BaseModel):
     username: str
     email: EmailStr
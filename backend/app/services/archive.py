@@ -0,0 +1,270 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.config import settings
+from core.database import shards
+from models.progress import Progress
+from models.progress_archive import ProgressArchive
+from models.user import User
+
+COLUMNS = {
+    "id": np.int64,
+    "user_id": np.int64,
+    "course_id": np.int64,
+    "progress_percent": np.float64,
+    "last_activity": "datetime64[us]",
+}
+DELETE_BATCH = 1000
+# pg_advisory_lock key held while a server archives a Postgres database
+ARCHIVE_LOCK_KEY = 0x52494141
+
+
+def _month_start(when: datetime) -> datetime:
+    return datetime(when.year, when.month, 1)
+
+
+def _next_month(when: datetime) -> datetime:
+    return datetime(when.year + when.month // 12, when.month % 12 + 1, 1)
+
+
+def _sorted(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    # by student, so a student's history is one contiguous slice
+    order = np.lexsort((columns["id"], columns["last_activity"], columns["user_id"]))
+    return {name: values[order] for name, values in columns.items()}
+
+
+def _columns(rows) -> dict[str, np.ndarray]:
+    return _sorted({name: np.array([getattr(r, name) for r in rows], dtype=dtype) for name, dtype in COLUMNS.items()})
+
+
+class MonthArchive:
+    """One archived month. The compressed .npz is unpacked once into plain
+    .npy files next to it, which are then memory-mapped, so only the pages
+    holding the requested student's rows are ever read."""
+
+    def __init__(self, path: str):
+        base = os.path.join(settings.PROGRESS_ARCHIVE_DIR, path)
+        cache = os.path.join(settings.PROGRESS_ARCHIVE_DIR, ".cache", path[: -len(".npz")])
+        if not all(os.path.exists(os.path.join(cache, f"{name}.npy")) for name in COLUMNS):
+            os.makedirs(cache, exist_ok=True)
+            with np.load(base) as packed:
+                for name in COLUMNS:
+                    tmp = os.path.join(cache, f"{name}.{os.getpid()}.tmp")
+                    with open(tmp, "wb") as f:
+                        np.save(f, packed[name])
+                    os.replace(tmp, os.path.join(cache, f"{name}.npy"))
+        self.columns = {name: np.load(os.path.join(cache, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+
+    def rows_for_user(self, user_id: int, course_id: int | None = None) -> list[dict]:
+        users = self.columns["user_id"]
+        lo = int(np.searchsorted(users, user_id, side="left"))
+        hi = int(np.searchsorted(users, user_id, side="right"))
+        if lo == hi:
+            return []
+        picked = np.arange(lo, hi)
+        if course_id is not None:
+            picked = picked[np.asarray(self.columns["course_id"][lo:hi]) == course_id]
+        values = {name: np.asarray(column[picked]).tolist() for name, column in self.columns.items()}
+        return [dict(zip(values, row)) for row in zip(*values.values())]
+
+
+# path -> opened archive; paths are versioned, so an entry never goes stale
+_archives: dict[str, MonthArchive] = {}
+
+
+async def _open(path: str) -> MonthArchive:
+    if path not in _archives:
+        _archives[path] = await run_in_threadpool(MonthArchive, path)
+    return _archives[path]
+
+
+async def archive_paths(db: AsyncSession, tenant: str) -> list[str]:
+    """The tenant's archived months, oldest first."""
+    result = await db.execute(
+        select(ProgressArchive.path).where(ProgressArchive.tenant == tenant).order_by(ProgressArchive.month)
+    )
+    return result.scalars().all()
+
+
+async def archived_month(path: str, user_id: int, course_id: int | None = None) -> list[dict]:
+    return (await _open(path)).rows_for_user(user_id, course_id)
+
+
+async def archived_progress(db: AsyncSession, tenant: str, user_id: int, course_id: int | None = None) -> list[dict]:
+    rows = []
+    for path in await archive_paths(db, tenant):
+        rows.extend(await archived_month(path, user_id, course_id))
+    return rows
+
+
+def merge_history(archived: list[dict], live) -> list:
+    """Archived rows first (they are older), minus any still present in the
+    live table after an interrupted archival run."""
+    live = list(live)
+    live_ids = {p.id for p in live}
+    return [r for r in archived if r["id"] not in live_ids] + live
+
+
+# ---- archival job ----------------------------------------------------------
+
+def _write(tenant: str, month: str, version: int, columns: dict[str, np.ndarray]) -> str:
+    # unique per attempt: a run that loses the race for this version removes
+    # only its own file, never the one that was committed
+    path = os.path.join(tenant, f"{month}.v{version}.{uuid.uuid4().hex[:12]}.npz")
+    full = os.path.join(settings.PROGRESS_ARCHIVE_DIR, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    tmp = f"{full}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp, full)
+    return path
+
+
+def _remove(path: str):
+    full = os.path.join(settings.PROGRESS_ARCHIVE_DIR, path)
+    if os.path.exists(full):
+        os.remove(full)
+    shutil.rmtree(os.path.join(settings.PROGRESS_ARCHIVE_DIR, ".cache", path[: -len(".npz")]), ignore_errors=True)
+    _archives.pop(path, None)
+
+
+async def _archive_month(db: AsyncSession, start: datetime, end: datetime) -> int:
+    # a row is archivable once a newer row for the same student and course
+    # exists; rows before `start` cannot be newer, so the window skips them
+    ranked = (
+        select(
+            Progress.id, Progress.user_id, Progress.course_id, Progress.progress_percent,
+            Progress.last_activity, User.tenant,
+            func.row_number().over(
+                partition_by=(Progress.user_id, Progress.course_id),
+                order_by=(Progress.last_activity.desc(), Progress.id.desc()),
+            ).label("rn"),
+        )
+        .join(User, User.id == Progress.user_id)
+        .where(Progress.last_activity >= start)
+        .subquery()
+    )
+    result = await db.execute(
+        select(ranked).where(ranked.c.rn > 1, ranked.c.last_activity < end)
+    )
+    by_tenant: dict[str, list] = {}
+    for row in result.all():
+        by_tenant.setdefault(row.tenant, []).append(row)
+    if not by_tenant:
+        return 0
+
+    month = start.strftime("%Y-%m")
+    written, replaced, archived = [], [], 0
+    try:
+        for tenant, rows in by_tenant.items():
+            columns = _columns(rows)
+            record = (await db.execute(
+                select(ProgressArchive).where(ProgressArchive.tenant == tenant, ProgressArchive.month == month)
+            )).scalar_one_or_none()
+            if record is None:
+                record = ProgressArchive(tenant=tenant, month=month, version=0)
+                db.add(record)
+            else:
+                # late rows for an archived month: rewrite it as a new version
+                with np.load(os.path.join(settings.PROGRESS_ARCHIVE_DIR, record.path)) as old:
+                    merged = {name: np.concatenate([old[name], columns[name]]) for name in COLUMNS}
+                _, first = np.unique(merged["id"], return_index=True)
+                columns = _sorted({name: values[first] for name, values in merged.items()})
+                replaced.append(record.path)
+
+            record.version += 1
+            record.path = await run_in_threadpool(_write, tenant, month, record.version, columns)
+            written.append(record.path)
+            record.row_count = len(columns["id"])
+            record.first_activity = columns["last_activity"].min().item()
+            record.last_activity = columns["last_activity"].max().item()
+
+            ids = [r.id for r in rows]
+            for i in range(0, len(ids), DELETE_BATCH):
+                await db.execute(delete(Progress).where(Progress.id.in_(ids[i:i + DELETE_BATCH])))
+            archived += len(rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        for path in written:
+            _remove(path)
+        raise
+
+    for path in replaced:
+        _remove(path)
+    return archived
+
+
+@asynccontextmanager
+async def _archiving(shard):
+    """Held while archiving one database, so servers running archival at the
+    same time take turns; yields False if another one is at it already."""
+    if shard.engine.dialect.name == "postgresql":
+        async with shard.engine.connect() as conn:
+            locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ARCHIVE_LOCK_KEY})).scalar()
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+        return
+    # other databases are files on this host, so a lock file next to the archives will do
+    os.makedirs(settings.PROGRESS_ARCHIVE_DIR, exist_ok=True)
+    name = hashlib.sha1(f"{shard.url}#{shard.schema or ''}".encode()).hexdigest()[:16]
+    with open(os.path.join(settings.PROGRESS_ARCHIVE_DIR, f".{name}.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+
+
+async def archive_progress(now: datetime | None = None) -> int:
+    """Move superseded progress rows from whole months older than
+    PROGRESS_ARCHIVE_AFTER_DAYS into per-tenant, per-month files. The latest
+    row of every student/course pair always stays in the live table."""
+    now = now or datetime.utcnow()
+    cutoff = _month_start(now - timedelta(days=settings.PROGRESS_ARCHIVE_AFTER_DAYS))
+    total = 0
+    seen = set()
+    for shard in shards.values():
+        if (shard.url, shard.schema) in seen:
+            continue
+        seen.add((shard.url, shard.schema))
+        async with _archiving(shard) as locked:
+            if not locked:
+                print(f"🗄  Skipping {shard.url}: another server is archiving it")
+                continue
+            async with shard.session() as db:
+                oldest = (await db.execute(select(func.min(Progress.last_activity)))).scalar()
+                if oldest is None:
+                    continue
+                start = _month_start(oldest)
+                while start < cutoff:
+                    end = _next_month(start)
+                    count = await _archive_month(db, start, end)
+                    if count:
+                        print(f"🗄  Archived {count} progress rows from {start:%Y-%m} ({shard.url})")
+                    total += count
+                    start = end
+    return total
+
+
+async def run_periodically():
+    while True:
+        await asyncio.sleep(settings.PROGRESS_ARCHIVE_INTERVAL_SECONDS)
+        try:
+            await archive_progress()
+        except Exception as e:
+            print(f"❌ Progress archival failed: {e}")
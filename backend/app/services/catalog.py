@@ -0,0 +1,178 @@
+import codecs
+import csv
+import io
+import json
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from models.course import Course
+from schemas.course import CourseCreate
+
+IMPORT_BATCH = 500
+EXPORT_BATCH = 1000
+MAX_REPORTED_ERRORS = 1000
+FIELDS = list(CourseCreate.model_fields)
+EXPORT_FIELDS = ["id"] + FIELDS
+
+
+# ---- parsing -----------------------------------------------------------------
+
+async def _lines(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def csv_records(chunks):
+    """(row number, dict or error message) per CSV record; the first record
+    is the header. Quoted fields may span lines."""
+    header = None
+    record, started, line_no = "", 0, 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not record:
+            started = line_no
+        record += line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        if not any(v.strip() for v in values):
+            continue
+        if len(values) != len(header):
+            yield started, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        # empty cells mean "not set"
+        yield started, {k: (v if v.strip() else None) for k, v in zip(header, values)}
+    if record:
+        yield started, "unterminated quoted field"
+
+
+async def ndjson_records(chunks):
+    line_no = 0
+    async for line in _lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line_no, "expected a JSON object"
+            continue
+        yield line_no, data
+
+
+def _validate(data: dict) -> dict:
+    row = CourseCreate.model_validate({k: data[k] for k in FIELDS if k in data}).model_dump()
+    if data.get("id") is not None:
+        try:
+            row["id"] = int(data["id"])
+        except (TypeError, ValueError):
+            raise ValueError("id must be an integer")
+    return row
+
+
+# ---- writing -----------------------------------------------------------------
+
+def _upsert(dialect: str, rows: list[dict]):
+    if dialect == "postgresql":
+        stmt = postgresql.insert(Course).values(rows)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(Course).values(rows)
+    else:
+        raise ValueError(f"course import does not support {dialect}")
+    return stmt.on_conflict_do_update(
+        index_elements=[Course.id], set_={f: stmt.excluded[f] for f in FIELDS}
+    )
+
+
+async def _advance_sequence(db: AsyncSession, schema: str | None):
+    # explicit ids do not advance the serial sequence
+    table = f'"{schema}".courses' if schema else "courses"
+    await db.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+    ))
+
+
+async def _flush(db: AsyncSession, batch: list[dict], report: dict, schema: str | None):
+    # rows with an id replace that course, the rest are new; a repeated id
+    # keeps its last row since one statement may not touch a row twice
+    by_id = {row["id"]: row for row in batch if "id" in row}
+    new = [row for row in batch if "id" not in row]
+    if by_id:
+        await db.execute(_upsert(db.bind.dialect.name, list(by_id.values())))
+        report["upserted"] += len(by_id)
+        # before the new rows take ids from it, or they may get one just upserted
+        if db.bind.dialect.name == "postgresql":
+            await _advance_sequence(db, schema)
+    if new:
+        await db.execute(insert(Course).values(new))
+        report["created"] += len(new)
+
+
+async def import_catalog(db: AsyncSession, records, schema: str | None = None) -> dict:
+    """Validate and write (row number, dict or error) records in multi-row
+    statements of IMPORT_BATCH. Nothing is committed here."""
+    report = {"created": 0, "upserted": 0, "failed": 0, "errors": [], "errors_truncated": False}
+    batch: list[dict] = []
+
+    def fail(row_no: int, errors: list[str]):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_no, "errors": errors})
+        else:
+            report["errors_truncated"] = True
+
+    async for row_no, data in records:
+        if isinstance(data, str):
+            fail(row_no, [data])
+            continue
+        try:
+            batch.append(_validate(data))
+        except ValidationError as e:
+            fail(row_no, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()])
+            continue
+        except ValueError as e:
+            fail(row_no, [str(e)])
+            continue
+        if len(batch) >= IMPORT_BATCH:
+            await _flush(db, batch, report, schema)
+            batch = []
+    if batch:
+        await _flush(db, batch, report, schema)
+    return report
+
+
+async def export_catalog(session_factory, fmt: str):
+    """Stream the catalog as CSV or NDJSON, EXPORT_BATCH rows at a time."""
+    async with session_factory() as db:
+        if fmt == "csv":
+            yield ",".join(EXPORT_FIELDS) + "\r\n"
+        result = await db.stream(
+            select(*(getattr(Course, f) for f in EXPORT_FIELDS))
+            .order_by(Course.id)
+            .execution_options(yield_per=EXPORT_BATCH)
+        )
+        async for partition in result.partitions(EXPORT_BATCH):
+            if fmt == "csv":
+                out = io.StringIO()
+                csv.writer(out).writerows(partition)
+                yield out.getvalue()
+            else:
+                yield "".join(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in partition)
@@ -1,13 +1,78 @@
 from email.message import EmailMessage
 import smtplib
 import os
+import threading
 from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
 
 load_dotenv()
 
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 465
+SMTP_TIMEOUT = 10
+
+# one logged-in connection per worker, reused across sends (and opened during
+# startup warmup) instead of a TLS handshake + login per email
+_smtp: smtplib.SMTP_SSL | None = None
+_smtp_lock = threading.Lock()
+
+
+def _connect(gmail_user: str, app_password: str) -> smtplib.SMTP_SSL:
+    global _smtp
+    if _smtp is None:
+        server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        server.login(gmail_user, app_password)
+        _smtp = server
+    return _smtp
+
+
+def _disconnect():
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp = None
+
+
+def _send(msg: EmailMessage, gmail_user: str, app_password: str):
+    with _smtp_lock:
+        try:
+            _connect(gmail_user, app_password).send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # the server drops idle connections; reconnect once
+            _disconnect()
+            _connect(gmail_user, app_password).send_message(msg)
+
+
+def _credentials() -> tuple[str | None, str | None]:
+    return os.getenv("GMAIL_USER"), os.getenv("GMAIL_APP_PASSWORD")
+
+
+async def connect_mail():
+    gmail_user, app_password = _credentials()
+    if not gmail_user or not app_password:
+        return False
+
+    def connect():
+        with _smtp_lock:
+            _connect(gmail_user, app_password)
+
+    await run_in_threadpool(connect)
+    return True
+
+
+async def close_mail():
+    def close():
+        with _smtp_lock:
+            _disconnect()
+
+    await run_in_threadpool(close)
+
+
 async def send_verification_email(to_email: str, token: str):
-    gmail_user = os.getenv("GMAIL_USER")
-    app_password = os.getenv("GMAIL_APP_PASSWORD")
+    gmail_user, app_password = _credentials()
 
     link = f"http://localhost:8000/api/auth/verify-email?token={token}"
     body = f"Click this link to verify your account:\n\n{link}"
@@ -19,9 +84,8 @@ async def send_verification_email(to_email: str, token: str):
     msg.set_content(body)
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(gmail_user, app_password)
-            server.send_message(msg)
+        # blocking SMTP I/O, kept off the event loop
+        await run_in_threadpool(_send, msg, gmail_user, app_password)
         print(f"✅ Verification email sent to {to_email}")
     except Exception as e:
         print(f"❌ Email send failed: {e}")
@@ -0,0 +1,302 @@
+import asyncio
+import codecs
+import fcntl
+import json
+import os
+import posixpath
+import re
+import struct
+import unicodedata
+import zipfile
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+
+# per book, in <books dir>/<filename>/:
+#   text.txt    normalized text, chapter after chapter
+#   pages.bin   little-endian int64 end offset (in text.txt) of every page
+#   book.json   status, title and the chapter index
+# text is written before its page offset, so every listed page is complete
+# and readers can page through a book while it is still being extracted
+OFFSET = struct.Struct("<q")
+READ_CHUNK = 64 * 1024
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "section", "article", "pre", "hr", "dd", "dt", "figcaption",
+}
+HEADING_TAGS = {"h1", "h2", "h3"}
+SKIP_TAGS = {"head", "script", "style", "svg", "math"}
+WHITESPACE = re.compile(r"\s+")
+NS = {
+    "c": "urn:oasis:names:tc:opendocument:xmlns:container",
+    "opf": "http://www.idpf.org/2007/opf",
+    "dc": "http://purl.org/dc/elements/1.1/",
+}
+
+
+class EpubError(ValueError):
+    pass
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class _ChapterParser(HTMLParser):
+    """Feeds finished paragraphs to `emit` as the XHTML streams in; only the
+    paragraph being read is held in memory."""
+
+    def __init__(self, emit):
+        super().__init__(convert_charrefs=True)
+        self.emit = emit
+        self.title = None
+        self._parts = []
+        self._skip = 0
+        self._heading = None
+
+    def _flush(self):
+        paragraph = _normalize("".join(self._parts))
+        self._parts = []
+        if paragraph:
+            self.emit(paragraph)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+            if tag in HEADING_TAGS and self.title is None:
+                self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_TAGS:
+            if self._heading is not None and tag in HEADING_TAGS:
+                self.title = _normalize("".join(self._heading)) or None
+                self._heading = None
+            self._flush()
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        self._parts.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class _Pager:
+    """Cuts paragraphs into pages of about EPUB_PAGE_WORDS words, breaking at
+    paragraph ends where it can, and appends them to text.txt / pages.bin."""
+
+    def __init__(self, text, offsets):
+        self.text = text
+        self.offsets = offsets
+        self.pages = 0
+        self._page = []
+        self._words = 0
+
+    def add(self, paragraph: str):
+        words = paragraph.split(" ")
+        limit = settings.EPUB_PAGE_WORDS
+        while self._words + len(words) > limit * 3 // 2:
+            # a paragraph much longer than a page is split mid-paragraph
+            room = max(limit - self._words, 1)
+            self._page.append(" ".join(words[:room]))
+            words = words[room:]
+            self.end_page()
+        self._page.append(" ".join(words))
+        self._words += len(words)
+        if self._words >= limit:
+            self.end_page()
+
+    def end_page(self):
+        if not self._page:
+            return
+        self.text.write(("\n\n".join(self._page) + "\n\n").encode())
+        self.text.flush()
+        self.offsets.write(OFFSET.pack(self.text.tell()))
+        self.offsets.flush()
+        self.pages += 1
+        self._page = []
+        self._words = 0
+
+
+def _spine(book: zipfile.ZipFile) -> tuple[str | None, list[str]]:
+    try:
+        container = ElementTree.fromstring(book.read("META-INF/container.xml"))
+        opf_path = container.find(".//c:rootfile", NS).get("full-path")
+        opf = ElementTree.fromstring(book.read(opf_path))
+    except (KeyError, AttributeError, ElementTree.ParseError) as e:
+        raise EpubError(f"not a readable EPUB: {e}")
+    base = posixpath.dirname(opf_path)
+    manifest = {
+        item.get("id"): posixpath.normpath(posixpath.join(base, item.get("href", "")))
+        for item in opf.iterfind(".//opf:manifest/opf:item", NS)
+    }
+    spine = [manifest[ref.get("idref")] for ref in opf.iterfind(".//opf:spine/opf:itemref", NS) if ref.get("idref") in manifest]
+    title = opf.findtext(".//dc:title", namespaces=NS)
+    return (title.strip() if title else None), spine
+
+
+def _write_manifest(folder: str, manifest: dict):
+    tmp = os.path.join(folder, f"book.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(folder, "book.json"))
+
+
+def extract_book(source: str, folder: str, lock=None):
+    """Blocking; run in a worker thread. Holds an exclusive lock on the book
+    while extracting, so resume_pending() can tell live jobs from dead ones;
+    `lock` is one resume_pending() already holds, released when done."""
+    os.makedirs(folder, exist_ok=True)
+    if lock is None:
+        lock = open(os.path.join(folder, ".lock"), "w")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+    with lock:
+        manifest = {"status": "processing", "title": None, "chapters": [], "error": None}
+        _write_manifest(folder, manifest)
+        try:
+            with zipfile.ZipFile(source) as book, \
+                    open(os.path.join(folder, "text.txt"), "wb") as text, \
+                    open(os.path.join(folder, "pages.bin"), "wb") as offsets:
+                manifest["title"], spine = _spine(book)
+                pager = _Pager(text, offsets)
+                for name in spine:
+                    first_page = pager.pages
+                    parser = _ChapterParser(pager.add)
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    read = 0
+                    try:
+                        member = book.open(name)
+                    except KeyError:
+                        continue
+                    with member:
+                        while chunk := member.read(READ_CHUNK):
+                            read += len(chunk)
+                            if read > settings.EPUB_MAX_CHAPTER_BYTES:
+                                raise EpubError(f"{name} is larger than {settings.EPUB_MAX_CHAPTER_BYTES} bytes")
+                            parser.feed(decoder.decode(chunk))
+                    parser.feed(decoder.decode(b"", final=True))
+                    parser.close()
+                    pager.end_page()
+                    if pager.pages > first_page:
+                        manifest["chapters"].append({
+                            "title": parser.title or f"Chapter {len(manifest['chapters']) + 1}",
+                            "first_page": first_page + 1,
+                            "pages": pager.pages - first_page,
+                        })
+                        _write_manifest(folder, manifest)
+            manifest["status"] = "ready"
+        except Exception as e:
+            # corrupt deflate streams (zlib.error), encrypted or unsupported
+            # members (RuntimeError, NotImplementedError) fail the book too,
+            # rather than leaving it "processing" forever
+            manifest["status"] = "failed"
+            manifest["error"] = str(e)
+        _write_manifest(folder, manifest)
+    return manifest
+
+
+# ---- reading ---------------------------------------------------------------
+
+def read_manifest(folder: str) -> dict | None:
+    try:
+        with open(os.path.join(folder, "book.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def pages_ready(folder: str) -> int:
+    try:
+        return os.path.getsize(os.path.join(folder, "pages.bin")) // OFFSET.size
+    except FileNotFoundError:
+        return 0
+
+
+def read_page(folder: str, page: int) -> str | None:
+    """1-based; None if the page does not exist (yet)."""
+    if page < 1 or page > pages_ready(folder):
+        return None
+    with open(os.path.join(folder, "pages.bin"), "rb") as f:
+        f.seek((page - 2) * OFFSET.size if page > 1 else 0)
+        raw = f.read(OFFSET.size * (2 if page > 1 else 1))
+    ends = [OFFSET.unpack_from(raw, i)[0] for i in range(0, len(raw), OFFSET.size)]
+    start, end = (ends[0], ends[1]) if page > 1 else (0, ends[0])
+    with open(os.path.join(folder, "text.txt"), "rb") as f:
+        f.seek(start)
+        return f.read(end - start).decode().strip()
+
+
+# ---- worker ----------------------------------------------------------------
+
+_queue: asyncio.Queue | None = None
+_worker: asyncio.Task | None = None
+
+
+async def _work():
+    while True:
+        source, folder, lock = await _queue.get()
+        try:
+            manifest = await run_in_threadpool(extract_book, source, folder, lock)
+            if manifest["status"] == "ready":
+                print(f"✅ Extracted {source}: {pages_ready(folder)} pages")
+            else:
+                print(f"❌ EPUB extraction failed for {source}: {manifest['error']}")
+        except Exception as e:
+            print(f"❌ EPUB extraction failed for {source}: {e}")
+        finally:
+            _queue.task_done()
+
+
+def submit(source: str, folder: str, lock=None):
+    """Queue a book for extraction; the worker starts with the first job."""
+    global _queue, _worker
+    if _queue is None:
+        _queue = asyncio.Queue()
+    if _worker is None or _worker.done():
+        _worker = asyncio.create_task(_work())
+    os.makedirs(folder, exist_ok=True)
+    _write_manifest(folder, {"status": "processing", "title": None, "chapters": [], "error": None})
+    _queue.put_nowait((source, folder, lock))
+
+
+def resume_pending(books_dir: str, source_dir: str):
+    """Requeue books left half-extracted by a stopped server. A book whose
+    lock is still held is being extracted by another worker and is skipped."""
+    if not os.path.isdir(books_dir):
+        return 0
+    resumed = 0
+    for name in os.listdir(books_dir):
+        folder = os.path.join(books_dir, name)
+        manifest = read_manifest(folder)
+        if manifest is None or manifest["status"] != "processing":
+            continue
+        lock = open(os.path.join(folder, ".lock"), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            continue
+        # finished between the two checks
+        if read_manifest(folder)["status"] != "processing":
+            lock.close()
+            continue
+        # held until the job is done, so nobody else requeues the book meanwhile
+        submit(os.path.join(source_dir, name), folder, lock)
+        resumed += 1
+    return resumed
+
+
+async def stop_worker():
+    global _worker
+    if _worker is not None:
+        _worker.cancel()
+        _worker = None
@@ -0,0 +1,231 @@
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.future import select
+from core.config import settings
+from core.metrics import current_request
+from models.course import Course
+from models.enrollment import Enrollment
+from models.progress import Progress
+from models.user import User
+from services.archive import archive_paths, archived_month
+
+# per job, in <EXPORT_DIR>/<tenant>/<job id>/:
+#   job.json    status (queued | running | ready | failed), counts, error
+#   export.zip  students / enrollments / progress NDJSON plus uploads/
+# any worker can answer status and download from these; only the worker that
+# accepted the job writes them
+EXPORT_BATCH = 1000
+STUDENT_FIELDS = ("id", "username", "email", "role", "is_active", "verified")
+
+# references to running jobs, so they are not garbage collected mid-way
+_jobs: set[asyncio.Task] = set()
+_running = None
+
+
+def _folder(tenant: str, job_id: str) -> str:
+    return os.path.join(settings.EXPORT_DIR, tenant, job_id)
+
+
+def _write_job(folder: str, job: dict):
+    tmp = os.path.join(folder, f"job.json.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp, os.path.join(folder, "job.json"))
+
+
+def read_job(tenant: str, job_id: str) -> dict | None:
+    if os.path.basename(job_id) != job_id:
+        return None
+    try:
+        with open(os.path.join(_folder(tenant, job_id), "job.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def archive_path(tenant: str, job_id: str) -> str:
+    return os.path.join(_folder(tenant, job_id), "export.zip")
+
+
+def _jobs_of(tenant: str):
+    root = os.path.join(settings.EXPORT_DIR, tenant)
+    if not os.path.isdir(root):
+        return
+    for job_id in os.listdir(root):
+        job = read_job(tenant, job_id)
+        if job is not None:
+            yield job
+
+
+def active_job(tenant: str, guardian_id: int) -> dict | None:
+    for job in _jobs_of(tenant):
+        if job["guardian_id"] == guardian_id and job["status"] in ("queued", "running"):
+            return job
+    return None
+
+
+def prune(tenant: str):
+    """Drop finished exports older than EXPORT_RETENTION_HOURS."""
+    cutoff = time.time() - settings.EXPORT_RETENTION_HOURS * 3600
+    for job in list(_jobs_of(tenant)):
+        if job["status"] in ("ready", "failed") and job["created_at"] < cutoff:
+            shutil.rmtree(_folder(tenant, job["id"]), ignore_errors=True)
+
+
+def _ndjson(row: dict) -> str:
+    return json.dumps(row, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)) + "\n"
+
+
+async def _write_rows(member, rows) -> int:
+    count = 0
+    async for partition in rows:
+        await run_in_threadpool(member.write, "".join(_ndjson(r) for r in partition).encode())
+        count += len(partition)
+    return count
+
+
+async def _stream(db, query):
+    result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH))
+    async for partition in result.mappings().partitions(EXPORT_BATCH):
+        yield [dict(r) for r in partition]
+
+
+async def _build(session_factory, tenant: str, guardian_id: int, upload_dir: str, path: str) -> dict:
+    counts = {"students": 0, "enrollments": 0, "progress": 0, "uploads": 0}
+    book = await run_in_threadpool(zipfile.ZipFile, path, "w", zipfile.ZIP_DEFLATED)
+    try:
+        async with session_factory() as db:
+            db.info["tenant"] = tenant
+            students = select(User.id).where(User.parent_id == guardian_id).scalar_subquery()
+
+            member = await run_in_threadpool(book.open, "students.ndjson", "w")
+            with member:
+                counts["students"] = await _write_rows(member, _stream(db, (
+                    select(*(getattr(User, f) for f in STUDENT_FIELDS))
+                    .where(User.parent_id == guardian_id).order_by(User.id)
+                )))
+
+            member = await run_in_threadpool(book.open, "enrollments.ndjson", "w")
+            with member:
+                counts["enrollments"] = await _write_rows(member, _stream(db, (
+                    select(
+                        Enrollment.student_id, Enrollment.course_id, Course.title,
+                        Enrollment.assigned_by, Enrollment.assigned_on,
+                    )
+                    .join(Course, Course.id == Enrollment.course_id)
+                    .where(Enrollment.student_id.in_(students))
+                    .order_by(Enrollment.student_id, Enrollment.id)
+                )))
+
+            # archived history a month at a time, then the live rows, one student
+            # at a time; rows an interrupted archival run left in the live table
+            # are written with the live rows only (as in merge_history)
+            result = await db.execute(select(User.id).where(User.parent_id == guardian_id).order_by(User.id))
+            student_ids = result.scalars().all()
+            months = await archive_paths(db, tenant)
+            member = await run_in_threadpool(book.open, "progress.ndjson", "w")
+            with member:
+                for student_id in student_ids:
+                    result = await db.execute(select(Progress.id).where(Progress.user_id == student_id))
+                    live_ids = set(result.scalars())
+                    for path in months:
+                        rows = [r for r in await archived_month(path, student_id) if r["id"] not in live_ids]
+                        if rows:
+                            await run_in_threadpool(member.write, "".join(_ndjson(r) for r in rows).encode())
+                            counts["progress"] += len(rows)
+                    counts["progress"] += await _write_rows(member, _stream(db, (
+                        select(Progress.id, Progress.user_id, Progress.course_id,
+                               Progress.progress_percent, Progress.last_activity)
+                        .where(Progress.user_id == student_id)
+                        .order_by(Progress.last_activity, Progress.id)
+                    )))
+
+        # uploads are named <user id>_<name>; zipfile copies them in chunks
+        owners = {f"{i}_" for i in [guardian_id, *student_ids]}
+        if os.path.isdir(upload_dir):
+            for name in sorted(os.listdir(upload_dir)):
+                source = os.path.join(upload_dir, name)
+                if name.split("_", 1)[0] + "_" in owners and os.path.isfile(source) and not name.endswith(".part"):
+                    await run_in_threadpool(book.write, source, f"uploads/{name}")
+                    counts["uploads"] += 1
+    finally:
+        await run_in_threadpool(book.close)
+    return counts
+
+
+async def _run(session_factory, tenant: str, job: dict, upload_dir: str, lock):
+    global _running
+    # started from the request that queued it; its statements are not that request's
+    current_request.set(None)
+    folder = _folder(tenant, job["id"])
+    if _running is None:
+        _running = asyncio.Semaphore(settings.EXPORT_CONCURRENCY)
+    with lock:
+        async with _running:
+            job["status"] = "running"
+            _write_job(folder, job)
+            tmp = os.path.join(folder, "export.zip.tmp")
+            try:
+                job["counts"] = await _build(session_factory, tenant, job["guardian_id"], upload_dir, tmp)
+                os.replace(tmp, archive_path(tenant, job["id"]))
+                job["size"] = os.path.getsize(archive_path(tenant, job["id"]))
+                job["status"] = "ready"
+                print(f"✅ Export {job['id']} ready: {job['counts']}")
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                print(f"❌ Export {job['id']} failed: {e}")
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            job["finished_at"] = time.time()
+            _write_job(folder, job)
+
+
+def start(session_factory, tenant: str, guardian_id: int, upload_dir: str) -> dict:
+    job = {
+        "id": uuid.uuid4().hex,
+        "guardian_id": guardian_id,
+        "status": "queued",
+        "created_at": time.time(),
+        "finished_at": None,
+        "counts": None,
+        "size": None,
+        "error": None,
+    }
+    folder = _folder(tenant, job["id"])
+    os.makedirs(folder, exist_ok=True)
+    # held from queueing to the end, so fail_interrupted() skips the job
+    lock = open(os.path.join(folder, ".lock"), "w")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    _write_job(folder, job)
+    task = asyncio.create_task(_run(session_factory, tenant, job, upload_dir, lock))
+    _jobs.add(task)
+    task.add_done_callback(_jobs.discard)
+    return job
+
+
+def fail_interrupted():
+    """Mark jobs whose worker stopped mid-export as failed; a job whose lock
+    is still held is running in another worker and is left alone."""
+    if not os.path.isdir(settings.EXPORT_DIR):
+        return
+    for tenant in os.listdir(settings.EXPORT_DIR):
+        for job in list(_jobs_of(tenant)):
+            if job["status"] not in ("queued", "running"):
+                continue
+            folder = _folder(tenant, job["id"])
+            with open(os.path.join(folder, ".lock"), "w") as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                job.update(status="failed", error="interrupted by a server restart", finished_at=time.time())
+                _write_job(folder, job)
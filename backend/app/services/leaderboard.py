@@ -0,0 +1,236 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.future import select
+from core.config import settings
+from core.database import shards
+from models.progress import Progress
+from models.user import User
+
+# day 0 of the activity bitsets; earlier activity is ignored
+EPOCH = date(2020, 1, 1)
+REPLAY_BATCH = 5000
+# rows edited in place are re-read from a little before the last catch-up, to
+# allow for clock differences between this server and the database
+CATCH_UP_OVERLAP = timedelta(minutes=1)
+
+
+def _day(when: datetime | date) -> int:
+    if isinstance(when, datetime):
+        when = when.date()
+    return (when - EPOCH).days
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _week(day: date) -> int:
+    year, week, _ = day.isocalendar()
+    return year * 100 + week
+
+
+class ClassBoard:
+    """Streaks and this week's top readers for one guardian's (class's) students.
+
+    days[student] is a bitset with bit n set when the student read on day
+    EPOCH + n. Weekly points are the progress gained this ISO week, kept in
+    `ranking` as (-points, student) sorted ascending, so top-k is a slice."""
+
+    def __init__(self):
+        self.days: dict[int, int] = {}
+        self.best: dict[tuple[int, int], float] = {}
+        self.week = _week(_today())
+        self.points: dict[int, float] = {}
+        self.ranking: list[tuple[float, int]] = []
+
+    def _roll_week(self):
+        week = _week(_today())
+        if week != self.week:
+            self.week = week
+            self.points = {}
+            self.ranking = []
+
+    def record(self, student_id: int, course_id: int, percent: float, when: datetime):
+        day = _day(when)
+        if day >= 0:
+            self.days[student_id] = self.days.get(student_id, 0) | (1 << day)
+
+        # progress only counts once: replays and regressions gain nothing
+        key = (student_id, course_id)
+        previous = self.best.get(key, 0.0)
+        if percent <= previous:
+            return
+        self.best[key] = percent
+
+        self._roll_week()
+        if _week(when.date()) == self.week:
+            self._add_points(student_id, percent - previous)
+
+    def _add_points(self, student_id: int, gained: float):
+        old = self.points.get(student_id)
+        if old is not None:
+            del self.ranking[bisect.bisect_left(self.ranking, (-old, student_id))]
+        new = (old or 0.0) + gained
+        self.points[student_id] = new
+        bisect.insort(self.ranking, (-new, student_id))
+
+    def top(self, k: int) -> list[tuple[int, float]]:
+        self._roll_week()
+        return [(student_id, -points) for points, student_id in self.ranking[:k]]
+
+    def streak(self, student_id: int) -> int:
+        """Consecutive active days ending today (or yesterday, if the student
+        has not read yet today)."""
+        bits = self.days.get(student_id, 0)
+        end = _day(_today())
+        if not bits >> end & 1:
+            end -= 1
+        if end < 0 or not bits >> end & 1:
+            return 0
+        window = bits & ((1 << (end + 1)) - 1)
+        last_gap = (~window & ((1 << (end + 1)) - 1)).bit_length() - 1
+        return end - last_gap
+
+    def active_days_this_week(self, student_id: int) -> int:
+        today = _today()
+        monday = _day(today - timedelta(days=today.weekday()))
+        span = _day(today) - monday + 1
+        return (self.days.get(student_id, 0) >> monday & ((1 << span) - 1)).bit_count()
+
+    def to_dict(self) -> dict:
+        return {
+            "week": self.week,
+            "days": {str(s): format(bits, "x") for s, bits in self.days.items()},
+            "best": {f"{s}:{c}": p for (s, c), p in self.best.items()},
+            "points": {str(s): p for s, p in self.points.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ClassBoard":
+        board = cls()
+        board.days = {int(s): int(bits, 16) for s, bits in data["days"].items()}
+        for key, percent in data["best"].items():
+            student_id, course_id = key.split(":")
+            board.best[(int(student_id), int(course_id))] = percent
+        if data["week"] == board.week:
+            for student_id, points in data["points"].items():
+                board._add_points(int(student_id), points)
+        return board
+
+
+def _shard_key(shard) -> str:
+    # progress ids are per database/schema; the URL itself is not written out
+    return hashlib.sha1(f"{shard.url}#{shard.schema or ''}".encode()).hexdigest()[:16]
+
+
+class Leaderboards:
+    """All class boards of this process, fed by every progress write and
+    caught up from the progress table on startup and periodically, which also
+    picks up writes made by other workers. New rows are found by id (`last_ids`,
+    per shard), since synced rows carry the client's possibly old timestamp;
+    rows edited in place by their last_activity, which the database sets, being
+    at or after `since`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.boards: dict[tuple[str, int], ClassBoard] = {}
+        self.last_ids: dict[str, int] = {}
+        self.since: datetime | None = None
+
+    def record(self, tenant: str, guardian_id: int | None, student_id: int, course_id: int,
+               percent: float, when: datetime):
+        if guardian_id is None:
+            return
+        key = (tenant, guardian_id)
+        if key not in self.boards:
+            self.boards[key] = ClassBoard()
+        self.boards[key].record(student_id, course_id, percent, when)
+
+    def board(self, tenant: str, guardian_id: int) -> ClassBoard:
+        return self.boards.get((tenant, guardian_id)) or ClassBoard()
+
+    async def catch_up(self):
+        started = datetime.utcnow()
+        seen = set()
+        for shard in shards.values():
+            key = _shard_key(shard)
+            if key in seen:
+                continue
+            seen.add(key)
+            last_id = self.last_ids.get(key)
+            query = (
+                select(
+                    User.tenant, User.parent_id, Progress.user_id, Progress.course_id,
+                    Progress.progress_percent, Progress.last_activity, Progress.id,
+                )
+                .join(User, User.id == Progress.user_id)
+                .where(User.parent_id.isnot(None), Progress.last_activity.isnot(None))
+                .order_by(Progress.last_activity, Progress.id)
+            )
+            if last_id is not None and self.since is not None:
+                # replaying a row twice is harmless, so overlap instead of risking a gap
+                query = query.where(or_(Progress.id > last_id, Progress.last_activity >= self.since))
+            newest = last_id or 0
+            async with shard.session() as db:
+                result = await db.stream(query.execution_options(yield_per=REPLAY_BATCH))
+                async for tenant, guardian_id, student_id, course_id, percent, when, row_id in result:
+                    self.record(tenant, guardian_id, student_id, course_id, percent, when)
+                    newest = max(newest, row_id)
+            self.last_ids[key] = newest
+        self.since = started - CATCH_UP_OVERLAP
+
+    def save(self):
+        data = {
+            "last_ids": self.last_ids,
+            "since": self.since.isoformat() if self.since else None,
+            "boards": [
+                {"tenant": tenant, "guardian_id": guardian_id, **board.to_dict()}
+                for (tenant, guardian_id), board in self.boards.items()
+            ],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            boards = {
+                (b["tenant"], b["guardian_id"]): ClassBoard.from_dict(b) for b in data["boards"]
+            }
+            last_ids = {key: int(row_id) for key, row_id in data["last_ids"].items()}
+            since = datetime.fromisoformat(data["since"]) if data["since"] else None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Ignoring unreadable leaderboard snapshot {self.path}: {e}")
+            return False
+        self.boards = boards
+        self.last_ids = last_ids
+        self.since = since
+        return True
+
+    async def restore(self):
+        self.load()
+        await self.catch_up()
+        print(f"✅ Leaderboards ready: {len(self.boards)} classes, up to progress ids {self.last_ids}")
+
+    async def run_periodically(self):
+        while True:
+            await asyncio.sleep(settings.LEADERBOARD_SNAPSHOT_SECONDS)
+            try:
+                await self.catch_up()
+                self.save()
+            except Exception as e:
+                print(f"❌ Leaderboard snapshot failed: {e}")
+
+
+leaderboards = Leaderboards(settings.LEADERBOARD_SNAPSHOT_PATH)
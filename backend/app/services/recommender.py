@@ -0,0 +1,251 @@
+import re
+import time
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from core.config import settings
+from models.course import Course
+from models.enrollment import Enrollment
+from models.progress import Progress
+
+# blend of the three signals used to rank courses
+CONTENT_WEIGHT = 0.6
+CO_ENROLLMENT_WEIGHT = 0.3
+COMPLETION_WEIGHT = 0.1
+
+_AGE_RE = re.compile(r"(\d+)\s*(?:-\s*(\d+))?")
+
+
+def _tokens(course) -> list[str]:
+    tokens = []
+    if course.reading_level:
+        tokens.append("level:" + course.reading_level.strip().lower())
+    if course.language:
+        tokens.append("lang:" + course.language.strip().lower())
+    if course.tags:
+        tokens.extend("tag:" + t.strip().lower() for t in course.tags.split(",") if t.strip())
+    return tokens
+
+
+def _numeric(course) -> tuple[float, float]:
+    difficulty = (course.difficulty or 0) / 5
+    age = 0.0
+    match = _AGE_RE.search(course.age_range or "")
+    if match:
+        low = int(match.group(1))
+        high = int(match.group(2) or low)
+        age = (low + high) / 2 / 18
+    return difficulty, age
+
+
+class CourseRecommender:
+    """Keeps a row-normalized course feature matrix plus co-enrollment and
+    completion signals in memory so whole classes can be scored at once."""
+
+    NUMERIC = 2  # difficulty, age midpoint
+
+    def __init__(self):
+        self.course_ids = np.zeros(0, dtype=np.int64)
+        self.row_of: dict[int, int] = {}
+        self.vocab: dict[str, int] = {}
+        self.features = np.zeros((0, self.NUMERIC), dtype=np.float32)
+        self.co_enrollment = np.zeros((0, 0), dtype=np.float32)
+        self.completion = np.zeros(0, dtype=np.float32)
+        self.loaded = False
+        self.signals_at = 0.0
+
+    # ---- feature matrix -------------------------------------------------
+
+    def _vector(self, course) -> np.ndarray:
+        for token in _tokens(course):
+            if token not in self.vocab:
+                self.vocab[token] = self.NUMERIC + len(self.vocab)
+        if self.features.shape[1] < self.NUMERIC + len(self.vocab):
+            grow = self.NUMERIC + len(self.vocab) - self.features.shape[1]
+            self.features = np.pad(self.features, ((0, 0), (0, grow)))
+
+        vec = np.zeros(self.features.shape[1], dtype=np.float32)
+        vec[: self.NUMERIC] = _numeric(course)
+        for token in _tokens(course):
+            vec[self.vocab[token]] = 1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def load_courses(self, courses):
+        self.course_ids = np.zeros(0, dtype=np.int64)
+        self.row_of = {}
+        self.vocab = {}
+        self.features = np.zeros((0, self.NUMERIC), dtype=np.float32)
+        self.loaded = False
+        for course in courses:
+            self._upsert(course)
+        self.co_enrollment = np.zeros((len(self.course_ids),) * 2, dtype=np.float32)
+        self.completion = np.zeros(len(self.course_ids), dtype=np.float32)
+        self.signals_at = 0.0
+        self.loaded = True
+
+    def upsert_course(self, course):
+        # before the first load there is nothing to patch; ensure_ready builds it all
+        if self.loaded:
+            self._upsert(course)
+
+    def invalidate(self):
+        """Drop everything; the next ensure_ready reloads courses and signals."""
+        self.loaded = False
+        self.signals_at = 0.0
+
+    def _upsert(self, course):
+        vec = self._vector(course)
+        row = self.row_of.get(course.id)
+        if row is not None:
+            self.features[row] = vec
+            return
+        row = len(self.course_ids)
+        self.row_of[course.id] = row
+        self.course_ids = np.append(self.course_ids, course.id)
+        self.features = np.vstack([self.features, vec])
+        if self.loaded:
+            self.co_enrollment = np.pad(self.co_enrollment, ((0, 1), (0, 1)))
+            self.completion = np.append(self.completion, np.float32(0))
+
+    def remove_course(self, course_id: int):
+        row = self.row_of.pop(course_id, None)
+        if row is None:
+            return
+        keep = np.arange(len(self.course_ids)) != row
+        self.course_ids = self.course_ids[keep]
+        self.features = self.features[keep]
+        self.co_enrollment = self.co_enrollment[np.ix_(keep, keep)]
+        self.completion = self.completion[keep]
+        self.row_of = {int(cid): i for i, cid in enumerate(self.course_ids)}
+
+    # ---- behavioural signals -------------------------------------------
+
+    def load_signals(self, enrollments, best_progress):
+        """enrollments: (student_id, course_id) pairs.
+        best_progress: (course_id, max progress_percent per student) pairs."""
+        n = len(self.course_ids)
+        co = np.zeros((n, n), dtype=np.float32)
+        by_student: dict[int, list[int]] = {}
+        for student_id, course_id in enrollments:
+            row = self.row_of.get(course_id)
+            if row is not None:
+                by_student.setdefault(student_id, []).append(row)
+        for rows in by_student.values():
+            if len(rows) > 1:
+                idx = np.asarray(rows)
+                co[np.ix_(idx, idx)] += 1
+        np.fill_diagonal(co, 0)
+        peak = co.max(axis=1, keepdims=True) if n else co
+        self.co_enrollment = np.divide(co, peak, out=np.zeros_like(co), where=peak > 0)
+
+        rows = np.fromiter((self.row_of.get(c, -1) for c, _ in best_progress), dtype=np.int64)
+        values = np.fromiter((p for _, p in best_progress), dtype=np.float32)
+        known = rows >= 0
+        totals = np.bincount(rows[known], weights=values[known], minlength=n)
+        counts = np.bincount(rows[known], minlength=n)
+        self.completion = (np.divide(totals, counts, out=np.zeros(n), where=counts > 0) / 100).astype(np.float32)
+        self.signals_at = time.monotonic()
+
+    # ---- scoring --------------------------------------------------------
+
+    def recommend(self, history: dict[int, dict[int, float]], k: int) -> dict[int, list[tuple[int, float]]]:
+        """history maps student id -> {enrolled course id: best progress}.
+        Returns student id -> [(course id, score)] best first, enrolled courses excluded."""
+        students = list(history)
+        n = len(self.course_ids)
+        if not students or n == 0:
+            return {s: [] for s in students}
+
+        weights = np.zeros((len(students), n), dtype=np.float32)
+        for i, student_id in enumerate(students):
+            for course_id, progress in history[student_id].items():
+                row = self.row_of.get(course_id)
+                if row is not None:
+                    # finished books say more about taste than ones just assigned
+                    weights[i, row] = 1.0 + (progress or 0) / 100
+        enrolled = weights > 0
+
+        profiles = weights @ self.features
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        profiles = np.divide(profiles, norms, out=np.zeros_like(profiles), where=norms > 0)
+        content = profiles @ self.features.T
+
+        co = enrolled.astype(np.float32) @ self.co_enrollment
+        counts = enrolled.sum(axis=1, keepdims=True)
+        co = np.divide(co, counts, out=np.zeros_like(co), where=counts > 0)
+
+        scores = CONTENT_WEIGHT * content + CO_ENROLLMENT_WEIGHT * co + COMPLETION_WEIGHT * self.completion
+        scores[enrolled] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = {}
+        for i, student_id in enumerate(students):
+            results[student_id] = [
+                (int(self.course_ids[row]), float(score))
+                for row, score in zip(top[i], top_scores[i])
+                if np.isfinite(score)
+            ]
+        return results
+
+
+# one matrix per tenant: course ids are only unique within a tenant's database
+recommenders: dict[str, CourseRecommender] = {}
+
+
+def recommender_for(tenant: str) -> CourseRecommender:
+    if tenant not in recommenders:
+        recommenders[tenant] = CourseRecommender()
+    return recommenders[tenant]
+
+
+async def ensure_ready(db: AsyncSession, recommender: CourseRecommender):
+    if not recommender.loaded:
+        result = await db.execute(select(Course).order_by(Course.id))
+        recommender.load_courses(result.scalars().all())
+
+    stale = time.monotonic() - recommender.signals_at > settings.RECOMMENDER_SIGNAL_SECONDS
+    if stale or not recommender.signals_at:
+        enrollments = await db.execute(select(Enrollment.student_id, Enrollment.course_id))
+        best = (
+            select(Progress.course_id, func.max(Progress.progress_percent).label("best"))
+            .group_by(Progress.user_id, Progress.course_id)
+        )
+        progress = await db.execute(best)
+        recommender.load_signals(enrollments.all(), [tuple(r) for r in progress.all()])
+
+
+async def recommend_for_students(db: AsyncSession, tenant: str, student_ids: list[int], k: int):
+    recommender = recommender_for(tenant)
+    await ensure_ready(db, recommender)
+
+    best = (
+        select(
+            Progress.user_id,
+            Progress.course_id,
+            func.max(Progress.progress_percent).label("best"),
+        )
+        .where(Progress.user_id.in_(student_ids))
+        .group_by(Progress.user_id, Progress.course_id)
+        .subquery()
+    )
+    rows = await db.execute(
+        select(Enrollment.student_id, Enrollment.course_id, best.c.best)
+        .outerjoin(
+            best,
+            (best.c.user_id == Enrollment.student_id) & (best.c.course_id == Enrollment.course_id),
+        )
+        .where(Enrollment.student_id.in_(student_ids))
+    )
+    history: dict[int, dict[int, float]] = {s: {} for s in student_ids}
+    for student_id, course_id, progress in rows:
+        history[student_id][course_id] = progress or 0.0
+
+    return recommender.recommend(history, k)
@@ -0,0 +1,145 @@
+import os
+import threading
+import uuid
+from datetime import date, timedelta
+from hashlib import blake2b
+import numpy as np
+from core.config import settings
+
+# one row per page turn; `dwell_ms` is the time spent on `page` before turning
+COLUMNS = {
+    "user_id": np.int64,
+    "session": np.int64,
+    "course_id": np.int64,    # -1 when reading an uploaded text
+    "text_id": np.int64,      # text_key(filename), 0 when reading a course
+    "ts_ms": np.int64,        # epoch milliseconds of the turn
+    "page": np.int32,
+    "dwell_ms": np.int32,
+    "words": np.int32,
+}
+DAY_MS = 86_400_000
+
+
+def text_key(value: str) -> int:
+    """Stable 64-bit id for session ids and uploaded file names."""
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+class TelemetryStore:
+    """Append-only column files under <root>/<tenant>/<YYYY-MM-DD>/<segment>/.
+    Every worker appends to its own segment, so writers never share a file;
+    a segment whose columns differ in length (a crash mid-append) is read up
+    to its shortest column. Files are memory-mapped for aggregation."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._segment = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+
+    def append(self, tenant: str, columns: dict[str, np.ndarray]) -> int:
+        days = columns["ts_ms"] // DAY_MS
+        with self._lock:
+            for day in np.unique(days):
+                picked = days == day
+                folder = os.path.join(
+                    self.root, tenant, (date(1970, 1, 1) + timedelta(days=int(day))).isoformat(), self._segment
+                )
+                os.makedirs(folder, exist_ok=True)
+                for name, dtype in COLUMNS.items():
+                    with open(os.path.join(folder, f"{name}.bin"), "ab") as f:
+                        f.write(np.ascontiguousarray(columns[name][picked], dtype=dtype).tobytes())
+        return len(days)
+
+    def _segment_columns(self, folder: str) -> dict[str, np.ndarray] | None:
+        paths = {name: os.path.join(folder, f"{name}.bin") for name in COLUMNS}
+        if not all(os.path.exists(p) for p in paths.values()):
+            return None
+        rows = min(os.path.getsize(paths[name]) // np.dtype(dtype).itemsize for name, dtype in COLUMNS.items())
+        if rows == 0:
+            return None
+        return {name: np.memmap(paths[name], dtype=dtype, mode="r", shape=(rows,)) for name, dtype in COLUMNS.items()}
+
+    def read(self, tenant: str, first: date, last: date, where=None) -> dict[str, np.ndarray]:
+        """Rows of whole days. `where(columns)` returns a row mask, applied to
+        each memory-mapped segment, so only the selected rows are copied."""
+        parts = []
+        day = first
+        while day <= last:
+            folder = os.path.join(self.root, tenant, day.isoformat())
+            if os.path.isdir(folder):
+                for segment in sorted(os.listdir(folder)):
+                    columns = self._segment_columns(os.path.join(folder, segment))
+                    if columns is None:
+                        continue
+                    if where is not None:
+                        keep = where(columns)
+                        columns = {name: np.asarray(values[keep]) for name, values in columns.items()}
+                    parts.append(columns)
+            day += timedelta(days=1)
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+
+    def fluency(
+        self, tenant: str, user_ids: list[int], first: date, last: date,
+        course_id: int | None = None, text_id: int | None = None,
+    ) -> dict[int, dict]:
+        """Per-student words per minute and time on page over whole days."""
+        def wanted(columns):
+            dwell = columns["dwell_ms"]
+            keep = np.isin(columns["user_id"], user_ids)
+            # idle tablets and zero-length turns say nothing about reading speed
+            keep &= (dwell > 0) & (dwell <= settings.TELEMETRY_MAX_DWELL_SECONDS * 1000)
+            if course_id is not None:
+                keep &= columns["course_id"] == course_id
+            if text_id is not None:
+                keep &= columns["text_id"] == text_id
+            return keep
+
+        picked = self.read(tenant, first, last, wanted)
+
+        # a retried upload repeats its rows; count each turn once
+        key_names = ("user_id", "session", "ts_ms", "page")
+        order = np.lexsort([picked[name] for name in reversed(key_names)])
+        distinct = np.ones(len(order), dtype=bool)
+        if len(order):
+            distinct[1:] = np.any([np.diff(picked[name][order]) != 0 for name in key_names], axis=0)
+        picked = {name: values[order[distinct]] for name, values in picked.items()}
+
+        students = np.unique(np.asarray(user_ids, dtype=np.int64))
+        index = np.searchsorted(students, picked["user_id"])
+        n = len(students)
+        pages = np.bincount(index, minlength=n)
+        words = np.bincount(index, weights=picked["words"], minlength=n)
+        dwell_ms = np.bincount(index, weights=picked["dwell_ms"], minlength=n)
+
+        student_days = np.unique(index * 100_000 + picked["ts_ms"] // DAY_MS)
+        active_days = np.bincount(student_days // 100_000, minlength=n)
+
+        # medians per student from one sort on (student, dwell)
+        order = np.lexsort((picked["dwell_ms"], index))
+        sorted_dwell = picked["dwell_ms"][order].astype(np.float64)
+        starts = np.searchsorted(index[order], np.arange(n))
+        has = pages > 0
+        lo = np.where(has, starts + (pages - 1) // 2, 0)
+        hi = np.where(has, starts + pages // 2, 0)
+        median = np.zeros(n)
+        if len(sorted_dwell):
+            median = np.where(has, (sorted_dwell[lo] + sorted_dwell[hi]) / 2, 0.0)
+
+        minutes = dwell_ms / 60_000
+        return {
+            int(student): {
+                "pages": int(pages[i]),
+                "words": int(words[i]),
+                "reading_seconds": round(float(dwell_ms[i]) / 1000, 1),
+                "words_per_minute": round(float(words[i] / minutes[i]), 1) if minutes[i] else 0.0,
+                "avg_seconds_per_page": round(float(dwell_ms[i] / pages[i]) / 1000, 1) if pages[i] else 0.0,
+                "median_seconds_per_page": round(float(median[i]) / 1000, 1),
+                "active_days": int(active_days[i]),
+            }
+            for i, student in enumerate(students)
+        }
+
+
+telemetry_store = TelemetryStore(settings.TELEMETRY_DIR)
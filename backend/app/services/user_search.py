@@ -0,0 +1,246 @@
+import asyncio
+import time
+from array import array
+from bisect import bisect_left, insort
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, event, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from core.config import settings
+from core.database import shards
+from core.metrics import current_request
+from models.user import User
+
+FIELDS = ("id", "username", "email", "role", "is_active", "parent_id")
+
+
+def _grams(text: str, padded: bool) -> set[str]:
+    # padded like pg_trgm, so "  a" / " ab" also find one- and two-letter prefixes
+    text = ("  " + text) if padded else text
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _query_gram(q: str) -> set[str]:
+    return _grams(q, padded=False) if len(q) >= 3 else {("  " + q)[-3:]}
+
+
+class TrigramIndex:
+    """In-process trigram index over one tenant's usernames and emails, used
+    where the database has no pg_trgm (SQLite). Postings are append-only int
+    arrays; candidates from the rarest trigram are checked against the
+    current row, so entries left behind by renames are simply skipped.
+    Username prefixes come from a sorted list, already in result order."""
+
+    def __init__(self):
+        self.rows: dict[int, dict] = {}
+        self.postings: dict[str, array] = {}
+        self.names: list[tuple[str, int]] = []
+        self.max_id = 0
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, rows) -> "TrigramIndex":
+        index = cls()
+        for row in rows:
+            index.rows[row["id"]] = row
+            for gram in index._text_grams(row):
+                index.postings.setdefault(gram, array("i")).append(row["id"])
+        index.names = sorted((row["username"].lower(), user_id) for user_id, row in index.rows.items())
+        index.max_id = max(index.rows, default=0)
+        return index
+
+    def _text_grams(self, row: dict) -> set[str]:
+        return _grams(row["username"].lower(), True) | _grams(row["email"].lower(), True)
+
+    def upsert(self, row: dict):
+        old = self.rows.get(row["id"])
+        new_grams = self._text_grams(row)
+        if old is not None:
+            new_grams -= self._text_grams(old)
+            self._drop_name(old)
+        for gram in new_grams:
+            self.postings.setdefault(gram, array("i")).append(row["id"])
+        insort(self.names, (row["username"].lower(), row["id"]))
+        self.rows[row["id"]] = row
+        self.max_id = max(self.max_id, row["id"])
+
+    def _drop_name(self, row: dict):
+        key = (row["username"].lower(), row["id"])
+        i = bisect_left(self.names, key)
+        if i < len(self.names) and self.names[i] == key:
+            del self.names[i]
+
+    def remove(self, user_id: int):
+        row = self.rows.pop(user_id, None)
+        if row is not None:
+            self._drop_name(row)
+
+    def search(self, q: str, limit: int, role=None, is_active=None, parent_id=None) -> list[dict]:
+        q = q.lower()
+
+        def wanted(row):
+            return (
+                (role is None or row["role"] == role)
+                and (is_active is None or row["is_active"] == is_active)
+                and (parent_id is None or row["parent_id"] == parent_id)
+            )
+
+        found, seen = [], set()
+        for i in range(bisect_left(self.names, (q,)), len(self.names)):
+            name, user_id = self.names[i]
+            if len(found) >= limit or not name.startswith(q):
+                break
+            seen.add(user_id)
+            if wanted(self.rows[user_id]):
+                found.append(self.rows[user_id])
+
+        # then other matches (email, or inside the username), in index order
+        others = []
+        if len(found) < limit:
+            postings = [self.postings.get(gram, ()) for gram in _query_gram(q)]
+            for user_id in min(postings, key=len):
+                if len(found) + len(others) >= limit:
+                    break
+                row = self.rows.get(user_id)
+                if row is None or user_id in seen:
+                    continue
+                seen.add(user_id)
+                username, email = row["username"].lower(), row["email"].lower()
+                matches = (q in username or q in email) if len(q) >= 3 else email.startswith(q)
+                if matches and wanted(row):
+                    others.append(row)
+        return found + sorted(others, key=lambda r: r["username"])
+
+
+# tenant -> index; built from the database on first search and kept current
+# from commits in this worker. Users other workers create are picked up by id
+# on every search; their edits by a background rebuild every
+# USER_SEARCH_REBUILD_SECONDS, while the old index keeps serving.
+_indexes: dict[str, TrigramIndex] = {}
+_rebuilding: set[str] = set()
+# tenant -> changes committed while its index is being built, replayed onto
+# the new index before it is installed
+_missed: dict[str, list] = {}
+# one build per tenant at a time; a second one would reset the first one's _missed
+_build_locks: dict[str, asyncio.Lock] = {}
+
+
+async def _load(db: AsyncSession, tenant: str, after_id: int = 0) -> list[dict]:
+    result = await db.execute(
+        select(*(getattr(User, f) for f in FIELDS)).where(User.tenant == tenant, User.id > after_id)
+    )
+    return [dict(zip(FIELDS, row)) for row in result.all()]
+
+
+def _apply(index: TrigramIndex, change):
+    if isinstance(change, dict):
+        index.upsert(change)
+    else:
+        index.remove(change)
+
+
+def _build_lock(tenant: str) -> asyncio.Lock:
+    return _build_locks.setdefault(tenant, asyncio.Lock())
+
+
+async def _build(db: AsyncSession, tenant: str) -> TrigramIndex:
+    """Callers hold _build_lock(tenant)."""
+    # replaying a change the load already saw is harmless, so start recording first
+    _missed[tenant] = []
+    try:
+        index = await run_in_threadpool(TrigramIndex.build, await _load(db, tenant))
+        for change in _missed[tenant]:
+            _apply(index, change)
+        return index
+    finally:
+        del _missed[tenant]
+
+
+async def _rebuild(tenant: str):
+    # started from a search request; its statements are not that request's
+    current_request.set(None)
+    try:
+        async with _build_lock(tenant), shards[tenant].session() as db:
+            _indexes[tenant] = await _build(db, tenant)
+    except Exception as e:
+        print(f"❌ User search index rebuild for {tenant} failed: {e}")
+    finally:
+        _rebuilding.discard(tenant)
+
+
+async def _index_for(db: AsyncSession, tenant: str) -> TrigramIndex:
+    index = _indexes.get(tenant)
+    if index is None:
+        # concurrent first searches wait for the one building it
+        async with _build_lock(tenant):
+            index = _indexes.get(tenant)
+            if index is None:
+                index = _indexes[tenant] = await _build(db, tenant)
+        return index
+    if time.monotonic() - index.built_at > settings.USER_SEARCH_REBUILD_SECONDS and tenant not in _rebuilding:
+        _rebuilding.add(tenant)
+        asyncio.create_task(_rebuild(tenant))
+    for row in await _load(db, tenant, index.max_id):
+        index.upsert(row)
+    return index
+
+
+def _escape_like(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_users(
+    db: AsyncSession, tenant: str, q: str, limit: int,
+    role: str | None = None, is_active: bool | None = None, parent_id: int | None = None,
+) -> list[dict]:
+    """Substring match on username/email (prefix for one or two letters),
+    username-prefix matches first."""
+    if db.bind.dialect.name != "postgresql":
+        index = await _index_for(db, tenant)
+        return index.search(q, limit, role, is_active, parent_id)
+
+    # served by the gin_trgm_ops indexes on users.username / users.email
+    pattern = _escape_like(q) + "%" if len(q) < 3 else "%" + _escape_like(q) + "%"
+    query = select(*(getattr(User, f) for f in FIELDS)).where(
+        or_(User.username.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\"))
+    )
+    if role is not None:
+        query = query.where(User.role == role)
+    if is_active is not None:
+        query = query.where(User.is_active == is_active)
+    if parent_id is not None:
+        query = query.where(User.parent_id == parent_id)
+    starts = case((func.lower(User.username).startswith(q.lower(), autoescape=True), 0), else_=1)
+    result = await db.execute(query.order_by(starts, User.username).limit(limit))
+    return [dict(zip(FIELDS, row)) for row in result.all()]
+
+
+# ---- keeping in-process indexes current ------------------------------------
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    if not _indexes and not _missed:
+        return
+    changes = session.info.setdefault("user_search_changes", [])
+    for user in list(session.new) + list(session.dirty):
+        if isinstance(user, User):
+            changes.append((user.tenant, {f: getattr(user, f) for f in FIELDS}))
+    for user in session.deleted:
+        if isinstance(user, User):
+            changes.append((user.tenant, user.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_user_changes(session):
+    for tenant, change in session.info.pop("user_search_changes", ()):
+        if tenant in _missed:
+            _missed[tenant].append(change)
+        index = _indexes.get(tenant)
+        if index is not None:
+            _apply(index, change)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_user_changes(session):
+    session.info.pop("user_search_changes", None)
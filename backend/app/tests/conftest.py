@@ -0,0 +1,149 @@
+"""Shared fixtures. Everything runs against SQLite files in a temporary folder:
+the "default" tenant has its own database, "lincoln" and "adams" share a
+second one, so both shard routing and per-tenant scoping inside one database
+are exercised. Tests are async and run on one event loop (anyio)."""
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+TMP = tempfile.mkdtemp(prefix="readiq-tests-")
+SHARED_DB = f"sqlite+aiosqlite:///{TMP}/schools.db"
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{TMP}/default.db",
+    "TENANT_DATABASES": json.dumps({"lincoln": SHARED_DB, "adams": SHARED_DB}),
+    "TENANT_HEADER_TENANTS": json.dumps(["default", "lincoln", "adams"]),
+    "SQL_ECHO": "false",
+    "QUERY_GUARD": "raise",
+    "STARTUP_WARMUP": "false",
+    "ADMISSION_CONTROL": "false",
+    "DASHBOARD_CACHE_SECONDS": "0",
+    "LEADERBOARD_SNAPSHOT_PATH": os.path.join(TMP, "leaderboards.json"),
+    "PROGRESS_ARCHIVE_DIR": os.path.join(TMP, "archive"),
+    "EXPORT_DIR": os.path.join(TMP, "exports"),
+    "TELEMETRY_DIR": os.path.join(TMP, "telemetry"),
+})
+
+import shutil
+import httpx
+import pytest
+from core import database
+from core.database import Base, recent_writers, shards
+from core.security import hash_password
+from core.tokens import token_validator
+from models.course import Course
+from models.enrollment import Enrollment
+from models.user import User
+from routes import reading
+from services import archive, user_search
+import main
+
+PASSWORD = "pw"
+# per tenant: name -> (id, role, guardian). Ids are only unique per database,
+# and "lincoln" reuses the default tenant's on purpose
+SCHOOLS = {
+    "default": {"admin": (1, "admin", None), "parent": (2, "parent", None), "kid1": (3, "student", "parent"), "kid2": (4, "student", "parent")},
+    "lincoln": {"admin": (1, "admin", None), "parent": (2, "parent", None), "kid1": (3, "student", "parent"), "kid2": (4, "student", "parent")},
+    "adams": {"admin": (11, "admin", None), "parent": (12, "parent", None), "kid1": (13, "student", "parent"), "kid2": (14, "student", "parent")},
+}
+_hashed = hash_password(PASSWORD)
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def app():
+    return main.create_app()
+
+
+@pytest.fixture(scope="session")
+async def engines(anyio_backend):
+    yield
+    await database.dispose_engines()
+
+
+def _databases():
+    seen = {}
+    for tenant, shard in shards.items():
+        seen.setdefault((shard.url, shard.schema), (shard, []))[1].append(tenant)
+    return seen.values()
+
+
+@pytest.fixture
+async def schools(engines, tmp_path, monkeypatch):
+    """Fresh tables on every database, seeded per tenant with an admin, a
+    parent and two students enrolled in courses 1-2; returns their ids."""
+    for shard, tenants in _databases():
+        async with shard.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with shard.session() as db:
+            db.add_all(Course(id=i, title=f"Book {i}", difficulty=i, language="English") for i in range(1, 4))
+            for tenant in tenants:
+                for name, (user_id, role, guardian) in SCHOOLS[tenant].items():
+                    db.add(User(
+                        id=user_id, username=f"{tenant}-{name}", email=f"{name}@{tenant}.school.io",
+                        hashed_password=_hashed, role=role, verified=True, tenant=tenant,
+                        parent_id=SCHOOLS[tenant][guardian][0] if guardian else None,
+                    ))
+            await db.flush()
+            for tenant in tenants:
+                ids = {name: user[0] for name, user in SCHOOLS[tenant].items()}
+                db.add_all([
+                    Enrollment(student_id=ids["kid1"], course_id=1, assigned_by=ids["parent"]),
+                    Enrollment(student_id=ids["kid1"], course_id=2, assigned_by=ids["parent"]),
+                    Enrollment(student_id=ids["kid2"], course_id=2, assigned_by=ids["parent"]),
+                ])
+            await db.commit()
+
+    token_validator._verified.clear()
+    token_validator._generations.clear()
+    recent_writers.clear()
+    user_search._indexes.clear()
+    archive._archives.clear()
+    shutil.rmtree(os.environ["PROGRESS_ARCHIVE_DIR"], ignore_errors=True)
+    monkeypatch.setattr(reading, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    return {tenant: {name: user[0] for name, user in users.items()} for tenant, users in SCHOOLS.items()}
+
+
+@pytest.fixture
+async def client(app, schools):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def login(client, tenant: str, name: str) -> dict:
+    """Authorization header for a seeded user."""
+    r = await client.post(
+        "/api/auth/login", json={"email": f"{name}@{tenant}.school.io", "password": PASSWORD},
+        headers={"X-Tenant": tenant},
+    )
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def make_epub(chapters: list[str], title: str = "A Book") -> bytes:
+    """Minimal EPUB: container, package document and one XHTML file per chapter."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as book:
+        book.writestr("mimetype", "application/epub+zip")
+        book.writestr(
+            "META-INF/container.xml",
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf"/></rootfiles></container>',
+        )
+        items = "".join(f'<item id="c{i}" href="c{i}.xhtml"/>' for i in range(len(chapters)))
+        refs = "".join(f'<itemref idref="c{i}"/>' for i in range(len(chapters)))
+        book.writestr(
+            "OEBPS/content.opf",
+            '<package xmlns="http://www.idpf.org/2007/opf" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<metadata><dc:title>{title}</dc:title></metadata>"
+            f"<manifest>{items}</manifest><spine>{refs}</spine></package>",
+        )
+        for i, text in enumerate(chapters):
+            book.writestr(f"OEBPS/c{i}.xhtml", f"<html><body><h1>Chapter {i + 1}</h1><p>{text}</p></body></html>")
+    return buffer.getvalue()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+from datetime import datetime
+import numpy as np
+import pytest
+from sqlalchemy import func, select
+from conftest import login
+from core.config import settings
+from core.database import shards
+from models.progress import Progress
+from models.progress_archive import ProgressArchive
+from services import archive
+
+pytestmark = pytest.mark.anyio
+NOW = datetime(2025, 5, 1)
+
+
+async def _history(schools):
+    kids = schools["default"]
+    async with shards["default"].session() as db:
+        for month in range(1, 7):
+            db.add(Progress(user_id=kids["kid1"], course_id=1, progress_percent=month * 10, last_activity=datetime(2024, month, 5)))
+            db.add(Progress(user_id=kids["kid2"], course_id=2, progress_percent=month * 5, last_activity=datetime(2024, month, 7)))
+        await db.commit()
+
+
+async def test_archived_history_is_merged_back(client, schools):
+    await _history(schools)
+    kid = await login(client, "default", "kid1")
+    parent = await login(client, "default", "parent")
+    own = (await client.get("/api/protected/progress/", headers=kid)).json()
+    guardian = (await client.get(f"/api/protected/students/{schools['default']['kid1']}/progress", headers=parent)).json()
+
+    assert await archive.archive_progress(now=NOW) == 8
+    async with shards["default"].session() as db:
+        assert (await db.execute(select(func.count()).select_from(Progress))).scalar() == 4
+
+    assert (await client.get("/api/protected/progress/", headers=kid)).json() == own
+    assert (await client.get(f"/api/protected/students/{schools['default']['kid1']}/progress", headers=parent)).json() == guardian
+
+
+async def test_concurrent_archival_runs_keep_all_history(client, schools):
+    await _history(schools)
+    kid = await login(client, "default", "kid1")
+    before = (await client.get("/api/protected/progress/", headers=kid)).json()
+
+    # every API worker with PROGRESS_ARCHIVE_INTERVAL_SECONDS runs this at once
+    counts = await asyncio.gather(*(archive.archive_progress(now=NOW) for _ in range(3)))
+    assert sum(counts) == 8
+
+    assert (await client.get("/api/protected/progress/", headers=kid)).json() == before
+    async with shards["default"].session() as db:
+        paths = (await db.execute(select(ProgressArchive.path))).scalars().all()
+    assert len(paths) == 4
+    assert all(os.path.exists(os.path.join(settings.PROGRESS_ARCHIVE_DIR, p)) for p in paths)
+
+
+async def test_each_write_gets_its_own_file(schools):
+    columns = {name: np.zeros(1, dtype=dtype) for name, dtype in archive.COLUMNS.items()}
+    first = archive._write("default", "2024-01", 1, columns)
+    second = archive._write("default", "2024-01", 1, columns)
+    assert first != second
+    # a failed attempt cleans up after itself only
+    archive._remove(second)
+    assert os.path.exists(os.path.join(settings.PROGRESS_ARCHIVE_DIR, first))
@@ -0,0 +1,51 @@
+import json
+import pytest
+from sqlalchemy import Insert
+from conftest import login
+from services import catalog
+
+pytestmark = pytest.mark.anyio
+
+
+async def _records(rows):
+    for i, row in enumerate(rows, 1):
+        yield i, row
+
+
+async def test_import_mixes_explicit_ids_and_new_rows(client, schools, monkeypatch):
+    monkeypatch.setattr(catalog, "IMPORT_BATCH", 2)
+    rows = [{"id": 10, "title": "Ten"}, {"title": "New A"}, {"title": "New B"}, {"id": 2, "title": "Two again"}, {"title": "New C"}]
+    admin = await login(client, "default", "admin")
+    r = await client.post(
+        "/api/protected/courses/import", content="".join(json.dumps(row) + "\n" for row in rows),
+        headers={**admin, "Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200, r.text
+    assert (r.json()["created"], r.json()["upserted"], r.json()["failed"]) == (3, 2, 0)
+
+    courses = {c["title"]: c["id"] for c in (await client.get("/api/protected/courses/", headers=admin)).json()}
+    assert courses["Ten"] == 10 and courses["Two again"] == 2
+    assert len({courses[t] for t in ("New A", "New B", "New C")} | {1, 2, 3, 10}) == 7
+
+
+class _RecordingSession:
+    """Just enough of an AsyncSession on Postgres to see statement order."""
+
+    class bind:
+        class dialect:
+            name = "postgresql"
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append("insert" if isinstance(statement, Insert) else str(statement))
+
+
+async def test_sequence_is_advanced_before_new_rows_on_postgres():
+    db = _RecordingSession()
+    await catalog.import_catalog(db, _records([{"id": 500, "title": "Upserted"}, {"title": "New"}]), "lincoln")
+    assert len(db.statements) == 3
+    upsert, setval, insert = db.statements
+    assert upsert == "insert" and insert == "insert"
+    assert "setval" in setval and '"lincoln".courses' in setval
@@ -0,0 +1,29 @@
+import pytest
+from conftest import login
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_each_encoding_has_its_own_etag(client, schools):
+    kid = await login(client, "default", "kid1")
+    r = await client.post(
+        "/api/protected/reading/upload", files={"file": ("long.txt", b"once upon a time " * 200, "text/plain")}, headers=kid,
+    )
+    url = f"/api/protected/reading/read/{r.json()['filename']}"
+
+    tags = {}
+    for encoding in ["gzip", "deflate", "identity"]:
+        r = await client.get(url, headers={**kid, "Accept-Encoding": encoding})
+        assert r.status_code == 200
+        assert r.headers.get("content-encoding", "identity") == encoding
+        tags[encoding] = r.headers["etag"]
+    assert len(set(tags.values())) == 3
+    assert tags["gzip"].endswith('-gzip"')
+
+    # a cached gzip body is only revalidated for a gzip response
+    r = await client.get(url, headers={**kid, "Accept-Encoding": "gzip", "If-None-Match": tags["gzip"]})
+    assert r.status_code == 304 and r.headers["etag"] == tags["gzip"]
+    r = await client.get(url, headers={**kid, "Accept-Encoding": "identity", "If-None-Match": tags["gzip"]})
+    assert r.status_code == 200 and r.headers["etag"] == tags["identity"]
+    r = await client.get(url, headers={**kid, "Accept-Encoding": "deflate", "If-None-Match": f'W/{tags["deflate"]}, "other"'})
+    assert r.status_code == 304
@@ -0,0 +1,45 @@
+import fcntl
+import os
+import pytest
+from conftest import make_epub
+from services import epub
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+async def worker(monkeypatch):
+    # a queue of its own, on this test's event loop
+    monkeypatch.setattr(epub, "_queue", None)
+    yield
+    await epub.stop_worker()
+
+
+def _half_extracted(tmp_path, name="1_tale.epub"):
+    """A book a stopped server left "processing"."""
+    source_dir, books_dir = tmp_path / "uploads", tmp_path / "uploads" / "books"
+    os.makedirs(books_dir / name)
+    (source_dir / name).write_bytes(make_epub(["One fish.", "Two fish."]))
+    epub._write_manifest(str(books_dir / name), {"status": "processing", "title": None, "chapters": [], "error": None})
+    return str(books_dir), str(source_dir), str(books_dir / name)
+
+
+async def test_workers_starting_together_requeue_a_book_once(tmp_path):
+    books_dir, source_dir, folder = _half_extracted(tmp_path)
+    assert [epub.resume_pending(books_dir, source_dir) for _ in range(3)] == [1, 0, 0]
+    await epub._queue.join()
+    assert epub.read_manifest(folder)["status"] == "ready"
+    assert epub.read_page(folder, 2) == "Chapter 2\n\nTwo fish."
+    # the job let go of the lock
+    assert epub.resume_pending(books_dir, source_dir) == 0
+    with open(os.path.join(folder, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+async def test_book_being_extracted_elsewhere_is_skipped(tmp_path):
+    books_dir, source_dir, folder = _half_extracted(tmp_path)
+    with open(os.path.join(folder, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert epub.resume_pending(books_dir, source_dir) == 0
+    assert epub.resume_pending(books_dir, source_dir) == 1
+    await epub._queue.join()
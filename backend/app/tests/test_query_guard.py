@@ -0,0 +1,86 @@
+import httpx
+import pytest
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.database import get_db
+from core.metrics import TimedRoute
+from core.query_guard import VIOLATIONS, QueryBudgetExceeded, bulk_queries, query_budget
+from models.course import Course
+import main
+
+pytestmark = pytest.mark.anyio
+
+router = APIRouter(prefix="/guarded", route_class=TimedRoute)
+
+
+@router.get("/one", dependencies=[Depends(query_budget(1))])
+async def one_statement(db: AsyncSession = Depends(get_db)):
+    await db.execute(select(Course.id).where(Course.id == 1))
+    return {}
+
+
+@router.get("/none", dependencies=[Depends(query_budget(0))])
+async def no_statements_allowed(db: AsyncSession = Depends(get_db)):
+    await db.execute(select(Course.id).where(Course.id == 1))
+    return {}
+
+
+@router.get("/n-plus-one", dependencies=[Depends(query_budget(10))])
+async def one_query_per_course(db: AsyncSession = Depends(get_db)):
+    for course_id in range(1, settings.QUERY_GUARD_REPEAT_LIMIT + 1):
+        await db.execute(select(Course.title).where(Course.id == course_id))
+    return {}
+
+
+@router.get("/duplicate", dependencies=[Depends(query_budget(10))])
+async def same_query_twice(db: AsyncSession = Depends(get_db)):
+    for _ in range(2):
+        await db.execute(select(Course.title).where(Course.id == 1))
+    return {}
+
+
+@router.get("/bulk", dependencies=[Depends(bulk_queries)])
+async def bulk(db: AsyncSession = Depends(get_db)):
+    for _ in range(settings.QUERY_GUARD_DEFAULT_BUDGET + 1):
+        await db.execute(select(Course.title).where(Course.id == 1))
+    return {}
+
+
+@pytest.fixture(scope="module")
+def guarded_app():
+    app = main.create_app()
+    app.include_router(router)
+    return app
+
+
+@pytest.fixture
+async def guarded(guarded_app, schools):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=guarded_app), base_url="http://test") as c:
+        yield c
+
+
+async def test_within_budget(guarded):
+    assert (await guarded.get("/guarded/one")).status_code == 200
+    assert (await guarded.get("/guarded/bulk")).status_code == 200
+
+
+@pytest.mark.parametrize("path, kind", [
+    ("/guarded/none", "[budget] 1 statements, budget 0"),
+    ("/guarded/n-plus-one", "[n_plus_one] 5x SELECT courses.title"),
+    ("/guarded/duplicate", "[duplicate] 2x SELECT courses.title"),
+])
+async def test_violations_raise(guarded, path, kind):
+    with pytest.raises(QueryBudgetExceeded, match=r"GET " + path) as raised:
+        await guarded.get(path)
+    assert kind in str(raised.value)
+
+
+async def test_warn_mode_logs_and_counts(guarded, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_GUARD", "warn")
+    before = VIOLATIONS._values.get(("/guarded/none", "budget"), 0)
+    with caplog.at_level("WARNING", logger="readiq.query_guard"):
+        assert (await guarded.get("/guarded/none")).status_code == 200
+    assert "[budget] 1 statements, budget 0" in caplog.text
+    assert VIOLATIONS._values.get(("/guarded/none", "budget"), 0) == before + 1
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from conftest import TMP, login
+from core.database import shards
+from models.enrollment import Enrollment
+from models.progress import Progress
+from models.user import User
+from tools.move_tenant import move_tenant
+
+pytestmark = pytest.mark.anyio
+ENROLLMENTS = "/api/protected/enrollments"
+
+
+async def test_tenants_are_routed_to_their_database(client, schools):
+    assert shards["lincoln"].url == shards["adams"].url != shards["default"].url
+    async with shards["default"].session() as db:
+        db.add(Progress(user_id=schools["default"]["kid1"], course_id=1, progress_percent=40, last_activity=datetime(2025, 1, 1)))
+        await db.commit()
+
+    # same id in both tenants, different databases
+    ours = (await client.get("/api/protected/progress/", headers=await login(client, "default", "kid1"))).json()
+    theirs = (await client.get("/api/protected/progress/", headers=await login(client, "lincoln", "kid1"))).json()
+    assert len(ours) == 1
+    assert theirs == []
+
+
+async def test_sessions_only_see_their_tenants_rows(schools):
+    async with shards["adams"].session() as db:
+        db.add(Progress(user_id=schools["lincoln"]["kid1"], course_id=1, progress_percent=10))
+        db.add(Progress(user_id=schools["adams"]["kid1"], course_id=1, progress_percent=20))
+        await db.commit()
+        db.info["tenant"] = "adams"
+        adams_kids = set(schools["adams"].values())
+        students = (await db.execute(select(Enrollment.student_id))).scalars().all()
+        assert len(students) == 3 and set(students) <= adams_kids
+        assert (await db.execute(select(Progress.progress_percent))).scalars().all() == [20]
+        assert (await db.execute(select(func.count()).select_from(User))).scalar() == 4
+
+
+async def test_admin_cannot_see_or_remove_another_schools_enrollments(client, schools):
+    lincoln_kid = schools["lincoln"]["kid1"]
+    async with shards["lincoln"].session() as db:
+        theirs = (await db.execute(select(Enrollment.id).where(Enrollment.student_id == lincoln_kid))).scalars().all()
+
+    admin = await login(client, "adams", "admin")
+    assert (await client.get(f"{ENROLLMENTS}/{lincoln_kid}", headers=admin)).status_code == 404
+    assert (await client.delete(f"{ENROLLMENTS}/{theirs[0]}", headers=admin)).status_code == 404
+    parent = await login(client, "adams", "parent")
+    assert (await client.delete(f"{ENROLLMENTS}/{theirs[0]}", headers=parent)).status_code == 404
+
+    r = await client.get(f"{ENROLLMENTS}/{lincoln_kid}", headers=await login(client, "lincoln", "admin"))
+    assert sorted(e["id"] for e in r.json()) == sorted(theirs)
+
+
+async def test_move_tenant_to_its_own_database(schools):
+    url = f"sqlite+aiosqlite:///{TMP}/adams-{os.getpid()}.db"
+    await move_tenant("adams", url, None, delete_source=True)
+
+    engine = create_async_engine(url)
+    async with engine.connect() as target:
+        users = (await target.execute(select(User.id, User.parent_id).order_by(User.id))).all()
+        enrollments = (await target.execute(select(func.count()).select_from(Enrollment))).scalar()
+    await engine.dispose()
+    ids = schools["adams"]
+    assert users == [(ids["admin"], None), (ids["parent"], None), (ids["kid1"], ids["parent"]), (ids["kid2"], ids["parent"])]
+    assert enrollments == 3
+
+    async with shards["adams"].session() as db:
+        assert (await db.execute(select(func.count()).select_from(User).where(User.tenant == "adams"))).scalar() == 0
+        assert (await db.execute(select(func.count()).select_from(User).where(User.tenant == "lincoln"))).scalar() == 4
+
+
+async def test_move_tenant_refuses_clashing_ids(schools):
+    # lincoln reuses the default tenant's user ids
+    with pytest.raises(SystemExit, match="4 users"):
+        await move_tenant("lincoln", shards["default"].url, None, delete_source=False)
+    async with shards["default"].session() as db:
+        assert (await db.execute(select(func.count()).select_from(User))).scalar() == 4
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import zipfile
+import pytest
+from conftest import login, make_epub
+from services import epub
+
+pytestmark = pytest.mark.anyio
+READING = "/api/protected/reading"
+
+
+async def _upload(client, headers, name: str, body: bytes, content_type: str) -> str:
+    r = await client.post(f"{READING}/upload", files={"file": (name, body, content_type)}, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()["filename"]
+
+
+async def _book_ready(client, headers, filename: str):
+    for _ in range(100):
+        r = await client.get(f"{READING}/books/{filename}", headers=headers)
+        if r.status_code == 200 and r.json()["status"] == "ready":
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"{filename} never finished extracting")
+
+
+async def test_same_user_id_in_two_tenants_sees_only_its_own_upload(client, schools):
+    # kid1 has id 3 in both tenants, so both uploads are named 3_story.txt
+    assert schools["default"]["kid1"] == schools["lincoln"]["kid1"]
+    ours = await login(client, "default", "kid1")
+    theirs = await login(client, "lincoln", "kid1")
+    filename = await _upload(client, ours, "story.txt", b"default story", "text/plain")
+    assert await _upload(client, theirs, "story.txt", b"lincoln story", "text/plain") == filename
+
+    assert (await client.get(f"{READING}/read/{filename}", headers=ours)).json() == {"content": "default story"}
+    assert (await client.get(f"{READING}/read/{filename}", headers=theirs)).json() == {"content": "lincoln story"}
+
+
+async def test_only_owner_guardian_and_admin_read_an_upload(client, schools):
+    filename = await _upload(client, await login(client, "default", "kid1"), "story.txt", b"once upon", "text/plain")
+    for name, status in [("parent", 200), ("admin", 200), ("kid2", 404)]:
+        r = await client.get(f"{READING}/read/{filename}", headers=await login(client, "default", name))
+        assert r.status_code == status, name
+    r = await client.get(f"{READING}/read/{filename}", headers=await login(client, "adams", "parent"))
+    assert r.status_code == 404
+
+
+async def test_export_leaves_out_other_tenants_uploads(client, schools):
+    await _upload(client, await login(client, "default", "kid1"), "story.txt", b"default story", "text/plain")
+    await _upload(client, await login(client, "lincoln", "kid1"), "story.txt", b"lincoln story", "text/plain")
+    parent = await login(client, "lincoln", "parent")
+
+    job = (await client.post("/api/protected/exports/", headers=parent)).json()
+    for _ in range(100):
+        job = (await client.get(f"/api/protected/exports/{job['id']}", headers=parent)).json()
+        if job["status"] in ["ready", "failed"]:
+            break
+        await asyncio.sleep(0.02)
+    assert job["status"] == "ready", job
+    assert job["counts"]["uploads"] == 1
+
+    r = await client.get(f"/api/protected/exports/{job['id']}/download", headers=parent)
+    with zipfile.ZipFile(io.BytesIO(r.content)) as archive:
+        assert archive.read("uploads/3_story.txt") == b"lincoln story"
+
+
+async def test_books_are_served_to_their_readers_only(client, schools):
+    owner = await login(client, "default", "kid1")
+    filename = await _upload(client, owner, "tale.epub", make_epub(["It was a dark night."]), "application/epub+zip")
+    await _book_ready(client, owner, filename)
+    assert (await client.get(f"{READING}/books/{filename}/pages/1", headers=owner)).status_code == 200
+
+    for tenant, name in [("default", "kid2"), ("lincoln", "kid1"), ("adams", "admin")]:
+        headers = await login(client, tenant, name)
+        assert (await client.get(f"{READING}/books/{filename}", headers=headers)).status_code == 404, (tenant, name)
+        assert (await client.get(f"{READING}/books/{filename}/pages/1", headers=headers)).status_code == 404, (tenant, name)
+    await epub.stop_worker()
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from core.database import shards
+from models.user import User
+from services import user_search
+
+pytestmark = pytest.mark.anyio
+
+
+async def _first_search(tenant: str) -> user_search.TrigramIndex:
+    async with shards[tenant].session() as db:
+        return await user_search._index_for(db, tenant)
+
+
+async def _add_user(tenant: str):
+    async with shards[tenant].session() as db:
+        db.add(User(
+            id=99, username=f"{tenant}-newcomer", email=f"newcomer@{tenant}.school.io",
+            hashed_password="x", role="student", tenant=tenant,
+        ))
+        await db.commit()
+
+
+async def test_concurrent_first_searches_share_one_build(schools):
+    first, second, _ = await asyncio.gather(_first_search("default"), _first_search("default"), _add_user("default"))
+    assert first is second is user_search._indexes["default"]
+    assert not user_search._missed
+    # committed while the index was being built, so replayed onto it
+    assert [r["id"] for r in first.search("newcomer", 10)] == [99]
+
+
+async def test_indexes_are_per_tenant(schools):
+    lincoln, adams = await asyncio.gather(_first_search("lincoln"), _first_search("adams"))
+    assert sorted(lincoln.rows) == sorted(schools["lincoln"].values())
+    assert sorted(adams.rows) == sorted(schools["adams"].values())
@@ -0,0 +1,39 @@
+"""Move superseded progress history into per-month columnar archive files.
+
+Run from backend/app (e.g. nightly from cron):
+
+    python -m tools.archive_progress
+    python -m tools.archive_progress --after-days 180
+
+Only whole months older than the horizon are archived, and the latest row of
+every student/course pair stays in the progress table. Archived months are
+recorded in progress_archives and read back by the progress history routes.
+PROGRESS_ARCHIVE_DIR must be shared by every API server.
+"""
+import argparse
+import asyncio
+import sys
+from core.config import settings
+from core.database import dispose_engines
+from services.archive import archive_progress
+
+
+async def run():
+    try:
+        total = await archive_progress()
+    finally:
+        await dispose_engines()
+    print(f"✅ Archived {total} progress rows older than {settings.PROGRESS_ARCHIVE_AFTER_DAYS} days")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old progress history")
+    parser.add_argument("--after-days", type=int, help="override PROGRESS_ARCHIVE_AFTER_DAYS")
+    args = parser.parse_args(argv)
+    if args.after_days is not None:
+        settings.PROGRESS_ARCHIVE_AFTER_DAYS = args.after_days
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
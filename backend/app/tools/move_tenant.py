@@ -0,0 +1,206 @@
+"""Move one tenant (school) to another database or schema.
+
+Run from backend/app:
+
+    python -m tools.move_tenant --tenant lincoln --to sqlite+aiosqlite:///./lincoln.db
+    python -m tools.move_tenant --tenant lincoln --to postgresql+asyncpg://.../shard2 --to-schema lincoln \\
+        --delete-source
+
+The source is wherever the current settings route the tenant. The course
+catalog is copied alongside the tenant's users, enrollments and progress with
+ids preserved, so ids keep matching (archived progress files included). If the
+target already uses any of those ids the move is refused; a course the target
+already has unchanged (moved there with another tenant) is shared. Afterwards
+point TENANT_DATABASES / TENANT_SCHEMAS at the new location and restart the API.
+"""
+import argparse
+import asyncio
+import sys
+from sqlalchemy import delete, func, insert, select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from core.config import settings
+from core.database import Base, dispose_engines, shards
+from models.user import User
+from models.course import Course
+from models.enrollment import Enrollment
+from models.progress import Progress
+from models.sync_receipt import SyncReceipt
+from models.progress_archive import ProgressArchive
+
+BATCH = 1000
+
+
+def _row(obj) -> dict:
+    return {c.name: getattr(obj, c.name) for c in obj.__table__.columns}
+
+
+async def _copy(source, target, query, table, transform=None) -> int:
+    copied = 0
+    result = await source.stream(query.execution_options(yield_per=BATCH))
+    async for partition in result.partitions(BATCH):
+        rows = [_row(r) for (r,) in partition]
+        if transform:
+            rows = [transform(r) for r in rows]
+        if rows:
+            await target.execute(insert(table), rows)
+            copied += len(rows)
+    return copied
+
+
+async def _clashes(source, target, model, where) -> int:
+    """How many of the source rows' ids are already taken in the target."""
+    clashes = 0
+    result = await source.stream(select(model.id).where(where).execution_options(yield_per=BATCH))
+    async for ids in result.scalars().partitions(BATCH):
+        found = await target.execute(select(func.count()).select_from(model).where(model.id.in_(ids)))
+        clashes += found.scalar()
+    return clashes
+
+
+async def _check_ids(source, target, tenant: str) -> tuple[set[int], list[str]]:
+    """Courses the target already has unchanged, and what would collide."""
+    tenant_users = select(User.id).where(User.tenant == tenant)
+    source_courses = {c.id: _row(c) for c in (await source.execute(select(Course))).scalars()}
+    course_ids = list(source_courses)
+    shared_courses = set()
+    clashes = []
+    for start in range(0, len(course_ids), BATCH):
+        found = await target.execute(select(Course).where(Course.id.in_(course_ids[start:start + BATCH])))
+        for row in found.mappings():
+            if dict(row) == source_courses[row["id"]]:
+                shared_courses.add(row["id"])
+            else:
+                clashes.append(f"course {row['id']}")
+    for name, model, where in (
+        ("users", User, User.tenant == tenant),
+        ("enrollments", Enrollment, Enrollment.student_id.in_(tenant_users)),
+        ("progress rows", Progress, Progress.user_id.in_(tenant_users)),
+        ("sync receipts", SyncReceipt, SyncReceipt.user_id.in_(tenant_users)),
+        ("archived months", ProgressArchive, ProgressArchive.tenant == tenant),
+    ):
+        if count := await _clashes(source, target, model, where):
+            clashes.append(f"{count} {name}")
+    return shared_courses, clashes
+
+
+async def move_tenant(tenant: str, to_url: str, to_schema: str | None, delete_source: bool):
+    if tenant not in shards:
+        raise SystemExit(f"unknown tenant {tenant!r}; configure it or use {settings.DEFAULT_TENANT!r}")
+    shard = shards[tenant]
+
+    target_engine = create_async_engine(to_url)
+    schema_map = {"schema_translate_map": {None: to_schema}} if to_schema else {}
+    target_bind = target_engine.execution_options(**schema_map)
+
+    async with target_bind.begin() as conn:
+        if to_schema:
+            await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{to_schema}"'))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with shard.session() as source, target_bind.connect() as target:
+        shared_courses, clashes = await _check_ids(source, target, tenant)
+    if clashes:
+        await target_engine.dispose()
+        await dispose_engines()
+        raise SystemExit(f"target already uses ids of: {', '.join(clashes[:20])}; aborting")
+
+    async with shard.session() as source, target_bind.begin() as target:
+        user_ids = set((await source.execute(select(User.id).where(User.tenant == tenant))).scalars())
+        if not user_ids:
+            raise SystemExit(f"tenant {tenant!r} has no users in {shard.url}")
+        tenant_users = select(User.id).where(User.tenant == tenant)
+        courses = await _copy(
+            source, target, select(Course).where(Course.id.notin_(shared_courses)), Course.__table__
+        )
+
+        # parents before their students so self-referencing foreign keys hold
+        users = 0
+        placed: set[int] = set()
+        remaining = (await source.execute(select(User).where(User.tenant == tenant))).scalars().all()
+        while remaining:
+            ready = [
+                u for u in remaining
+                if u.parent_id is None or u.parent_id in placed or u.parent_id not in user_ids
+            ]
+            if not ready:
+                raise SystemExit("cycle in users.parent_id; aborting")
+            rows = [_row(u) for u in ready]
+            for row in rows:
+                if row["parent_id"] not in user_ids:
+                    row["parent_id"] = None
+            await target.execute(insert(User.__table__), rows)
+            placed.update(u.id for u in ready)
+            users += len(ready)
+            remaining = [u for u in remaining if u.id not in placed]
+
+        def keep_assigner(row):
+            if row["assigned_by"] not in user_ids:
+                row["assigned_by"] = None
+            return row
+
+        enrollments = await _copy(
+            source, target, select(Enrollment).where(Enrollment.student_id.in_(tenant_users)),
+            Enrollment.__table__, keep_assigner,
+        )
+        progress = await _copy(
+            source, target, select(Progress).where(Progress.user_id.in_(tenant_users)), Progress.__table__
+        )
+        receipts = await _copy(
+            source, target, select(SyncReceipt).where(SyncReceipt.user_id.in_(tenant_users)),
+            SyncReceipt.__table__,
+        )
+        # the archive files themselves stay put in PROGRESS_ARCHIVE_DIR
+        archives = await _copy(
+            source, target, select(ProgressArchive).where(ProgressArchive.tenant == tenant),
+            ProgressArchive.__table__,
+        )
+
+        if target.dialect.name == "postgresql":
+            for table in ("users", "courses", "enrollments", "progress", "sync_receipts", "progress_archives"):
+                await target.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                ))
+
+    print(f"✅ Copied {users} users, {courses} courses, {enrollments} enrollments, {progress} progress rows, "
+          f"{receipts} sync receipts, {archives} archived months")
+
+    if delete_source:
+        async with shard.session() as source:
+            tenant_users = select(User.id).where(User.tenant == tenant)
+            await source.execute(delete(Progress).where(Progress.user_id.in_(tenant_users)))
+            await source.execute(delete(SyncReceipt).where(SyncReceipt.user_id.in_(tenant_users)))
+            await source.execute(delete(ProgressArchive).where(ProgressArchive.tenant == tenant))
+            await source.execute(delete(Enrollment).where(Enrollment.student_id.in_(tenant_users)))
+            # links from users staying behind to users leaving
+            await source.execute(
+                update(Enrollment).where(Enrollment.assigned_by.in_(tenant_users)).values(assigned_by=None)
+            )
+            await source.execute(
+                update(User).where(User.parent_id.in_(tenant_users), User.tenant != tenant).values(parent_id=None)
+            )
+            await source.execute(delete(User).where(User.tenant == tenant))
+            await source.commit()
+        print(f"🗑  Removed tenant {tenant!r} from {shard.url}")
+
+    await target_engine.dispose()
+    await dispose_engines()
+
+    print("Now update your settings and restart the API:")
+    print(f'  TENANT_DATABASES: "{tenant}": "{to_url}"')
+    if to_schema:
+        print(f'  TENANT_SCHEMAS:   "{tenant}": "{to_schema}"')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move a tenant to another database/schema")
+    parser.add_argument("--tenant", required=True)
+    parser.add_argument("--to", required=True, dest="to_url", help="target database URL")
+    parser.add_argument("--to-schema", help="target Postgres schema")
+    parser.add_argument("--delete-source", action="store_true", help="remove the tenant's rows from the source")
+    args = parser.parse_args(argv)
+    asyncio.run(move_tenant(args.tenant, args.to_url, args.to_schema, args.delete_source))
+
+
+if __name__ == "__main__":
+    sys.exit(main())